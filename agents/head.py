@@ -4,7 +4,6 @@ from __future__ import annotations
 import os
 import inspect
 import json
-import subprocess
 import re
 
 from typing import Any, Dict, Optional
@@ -33,7 +32,16 @@ from db import (
 )
 
 from .head_profile import build_head_system_prompt
-from llm_client import chat_openai_compat, env_default_base_url
+from llm_client import chat_openai_compat, env_default_base_url, warmup as llm_warmup
+
+# Регулярки розбору повідомлень — компілюються один раз при імпорті
+_DIGITS_RE = re.compile(r"\d+")
+_WS_RE = re.compile(r"\s+")
+_CHY_RE = re.compile(r"\bчи\b")
+_NOTES_CMD_RE = re.compile(r"^(нотатки)(\s+\d+)?$")
+_SHOW_NOTES_CMD_RE = re.compile(r"^(покажи\s+нотатки)(\s+\d+)?$")
+_LOG_WORD_RE = re.compile(r"\bлог\b")
+_NUMBER_WORD_RE = re.compile(r"\b(\d+)\b")
 
 
 class HeadAgent:
@@ -66,6 +74,18 @@ class HeadAgent:
         # Паспорт / системний промпт для головного агента
         self.system_prompt = build_head_system_prompt()
 
+    def warmup(self) -> None:
+        """Проганяє "холодні" частини першого запиту без виклику LLM.
+
+        urllib-opener і idna-кодек (llm_client), перше підключення до БД і
+        запит нотаток — щоб перший чат після старту не платив за них.
+        """
+        llm_warmup()
+        try:
+            self._build_notes_context()
+        except Exception:
+            pass
+
     def ask_llm(self, user_text: str) -> str:
         """
         Виклик LM Studio / OpenAI-compatible як "мозок" HeadAgent-а.
@@ -326,7 +346,7 @@ class HeadAgent:
 
     def _extract_notes_limit(self, text: str, default: int = 10) -> int:
         """Витягує ліміт з тексту запиту (українською/англійською)."""
-        matches = re.findall(r"\d+", text)
+        matches = _DIGITS_RE.findall(text)
         if matches:
             try:
                 value = int(matches[0])
@@ -390,7 +410,7 @@ class HeadAgent:
                 if s.startswith(left) and s.endswith(right):
                     s = s[1:-1].strip()
                     break
-        s = re.sub(r"\s+", " ", s)
+        s = _WS_RE.sub(" ", s)
         return s
 
     def _parse_note_save_request(self, lower_norm: str) -> Optional[str]:
@@ -616,7 +636,7 @@ class HeadAgent:
             for m in ("може", "напевно", "як думаєш", "здається")
         ):
             return False
-        if re.search(r"\bчи\b", lower_norm):
+        if _CHY_RE.search(lower_norm):
             return False
         s = lower_norm.strip()
         # Питаємо ТІЛЬКИ при явних маркерах “домовленості”
@@ -639,9 +659,9 @@ class HeadAgent:
             return False
 
         # Командні форми (строго), щоб не тригеритись на "нотаткою/нотатка" в звичайних реченнях
-        if re.match(r"^(нотатки)(\s+\d+)?$", t):
+        if _NOTES_CMD_RE.match(t):
             return True
-        if re.match(r"^(покажи\s+нотатки)(\s+\d+)?$", t):
+        if _SHOW_NOTES_CMD_RE.match(t):
             return True
         if t in (
             "head нотатки",
@@ -654,7 +674,7 @@ class HeadAgent:
 
     def _is_log_view_request(self, lower_text: str) -> bool:
         """Чи просить користувач показати лог."""
-        if re.search(r"\bлог\b", lower_text):
+        if _LOG_WORD_RE.search(lower_text):
             return True
         if "show log" in lower_text:
             return True
@@ -682,29 +702,21 @@ class HeadAgent:
         return s[:limit].rstrip() + "…"
 
     def _run_pytest(self) -> str:
-        """Запускає pytest у поточному робочому каталозі репо."""
-        # Найбільш сумісний виклик (не залежить від того, чи є pytest як окремий executable в PATH)
-        cmd = ["python", "-m", "pytest", "-q"]
+        """Запускає pytest у поточному робочому каталозі репо (через tools_allowlist.run_pytest)."""
+        if ta is None:
+            return "[pytest] Не вдалося запустити pytest: tools_allowlist недоступний"
         try:
-            proc = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300,
-            )
-        except subprocess.TimeoutExpired:
-            return "[pytest] Timeout (300s): тести виконуються занадто довго або зависли."
+            res = ta.run_pytest(timeout_s=300, limit=6000)
         except Exception as e:
             return f"[pytest] Не вдалося запустити pytest: {e}"
+        if res["returncode"] == "timeout":
+            return "[pytest] Timeout (300s): тести виконуються занадто довго або зависли."
 
-        out = (proc.stdout or "").strip()
-        err = (proc.stderr or "").strip()
-
-        parts = ["[pytest] finished", f"return_code={proc.returncode}"]
-        if out:
-            parts.append("\n[stdout]\n" + self._truncate(out))
-        if err:
-            parts.append("\n[stderr]\n" + self._truncate(err))
+        parts = ["[pytest] finished", f"return_code={res['returncode']}"]
+        if res["stdout"]:
+            parts.append("\n[stdout]\n" + res["stdout"])
+        if res["stderr"]:
+            parts.append("\n[stderr]\n" + res["stderr"])
 
         return "\n".join(parts)
 
@@ -1222,7 +1234,7 @@ class HeadAgent:
             project_id = self._get_current_project_id()
             if not project_id:
                 return "Немає активного проєкту, тому нотатку видалити не можу."
-            match = re.search(r"\b(\d+)\b", lower)
+            match = _NUMBER_WORD_RE.search(lower)
             if not match:
                 return "Вкажи id нотатки, наприклад: 'видали нотатку 12'."
             try:
@@ -1318,7 +1330,7 @@ class HeadAgent:
         ):
             try:
                 data = rt.git_diff()
-                if data.get("truncated"):
+                if data.get("stat_only"):
                     stat_parts = ["[git] git diff --stat", "return_code=0"]
                     if data.get("stat"):
                         stat_parts.append("\n[stdout]\n" + data["stat"])
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import traceback
 
 # Ensure agents are registered
@@ -12,7 +12,7 @@ from . import coder as _coder      # noqa: F401  # новий імпорт, що
 
 from db import log_run_error
 from .registry import create_agent, list_agents
-from .base import Context, Memory
+from .base import BaseAgent, Context, Memory
 from .router import rank_agents
 
 
@@ -219,7 +219,37 @@ class Supervisor:
 
         return team[: self.team_size], profile
 
+    def _agent(self, name: str, pool: Dict[str, BaseAgent]) -> BaseAgent:
+        """Бере агента з пулу або створює його (агенти не тримають стану між задачами)."""
+        agent = pool.get(name)
+        if agent is None:
+            agent = create_agent(name)
+            pool[name] = agent
+        return agent
+
     def run(self, task: str, memory: Memory) -> Dict[str, Any]:
+        return self._run(task, memory, {})
+
+    def run_batch(self, tasks: List[str], memory: Memory) -> List[Dict[str, Any]]:
+        """
+        Виконує кілька задач підряд з тією ж пам'яттю.
+
+        На відміну від виклику run() у циклі, агенти створюються один раз
+        на весь батч і перевикористовуються для кожної задачі.
+        """
+        return list(self.iter_batch(tasks, memory))
+
+    def iter_batch(self, tasks: Iterable[str], memory: Memory) -> Iterator[Dict[str, Any]]:
+        """
+        Те саме, що run_batch, але лениво: наступна задача стартує лише після
+        того, як викликач забрав попередній результат, тож зміни memory між
+        ними (прапорці, правила) вже діють для неї.
+        """
+        pool: Dict[str, BaseAgent] = {}
+        for task in tasks:
+            yield self._run(task, memory, pool)
+
+    def _run(self, task: str, memory: Memory, pool: Dict[str, BaseAgent]) -> Dict[str, Any]:
         # Визначаємо тип задачі один раз для всього пайплайну
         try:
             task_type = infer_task_type_from_router(task)
@@ -233,8 +263,8 @@ class Supervisor:
         need_critic = task_type in CRITIC_TASK_TYPES
 
         try:
-            planner = create_agent(self.planner_name)
-            critic = create_agent(self.critic_name)
+            planner = self._agent(self.planner_name, pool)
+            critic = self._agent(self.critic_name, pool)
 
             # 1) Plan
             plan_res = planner.run(task, memory, context)
@@ -247,7 +277,7 @@ class Supervisor:
                 team_outputs: Dict[str, str] = {}
 
                 for name in team_names:
-                    agent = create_agent(name)
+                    agent = self._agent(name, pool)
                     res = agent.run(task, memory, context)
                     out = res.output if isinstance(res.output, str) else str(res.output)
                     team_outputs[name] = out
@@ -260,7 +290,7 @@ class Supervisor:
                 ).strip()
 
                 # 3) PRELIM SYNTHESIS (перед критикою)
-                synthesizer = create_agent(self.synthesizer_name)
+                synthesizer = self._agent(self.synthesizer_name, pool)
                 prelim_res = synthesizer.run(task, memory, context)
                 prelim = prelim_res.output if isinstance(prelim_res.output, str) else team_draft
 
@@ -305,7 +335,7 @@ class Supervisor:
 
             # 2) SINGLE SOLVER MODE
             solver_name = self._pick_solver(task, memory, context)
-            solver = create_agent(solver_name)
+            solver = self._agent(solver_name, pool)
 
             # 3) Draft
             draft_res = solver.run(task, memory, context)
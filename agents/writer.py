@@ -1,5 +1,5 @@
 import os
-from typing import Optional, Dict
+from typing import Callable, Optional, Dict
 
 from .base import BaseAgent, AgentResult, Context, Memory
 from .registry import register_agent
@@ -157,9 +157,12 @@ def _get_current_project_name() -> Optional[str]:
     return None
 
 
-def call_writer_llm(task: str) -> str:
+def call_writer_llm(task: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
     """
     Виклик Writer через LM Studio / OpenAI-compatible з writer_model.
+
+    on_delta — якщо задано, відповідь стрімиться і шматки тексту віддаються
+    в нього по мірі генерації; повертається все одно повний текст.
     """
     try:
         project_name = _get_current_project_name()
@@ -184,6 +187,7 @@ def call_writer_llm(task: str) -> str:
             ],
             temperature=0.2,
             timeout_s=int(os.getenv("LLM_TIMEOUT_S", "120")),
+            on_delta=on_delta,
         )
     except Exception as exc:
         return f"[WriterAgent/LM Studio помилка: {exc}]"
@@ -144,6 +144,66 @@ def learn_from_tags(memory, tags):
         set_flag(memory, "expand_when_short", True)
 
 
+# Supervisor-и за конфігурацією (auto, team, team_size): створюємо один раз
+# на процес і перевикористовуємо для всіх задач (commands.py).
+_SUPERVISORS = {}
+
+
+def _get_supervisor(auto: bool, team: bool, team_size: int) -> Supervisor:
+    key = (auto, team, team_size)
+    sup = _SUPERVISORS.get(key)
+    if sup is None:
+        sup = Supervisor(
+            auto_solver=auto and not team,
+            auto_team=team,
+            team_size=team_size,
+        )
+        _SUPERVISORS[key] = sup
+    return sup
+
+
+def run_task(
+    task: str,
+    *,
+    auto: bool = False,
+    team: bool = False,
+    team_size: int = 2,
+    project: str = "default",
+    learn: bool = False,
+) -> dict:
+    """Виконує одну задачу через Supervisor у поточному процесі.
+
+    Це те саме, що робить CLI (`python app.py --task ...`), але без запуску
+    нового інтерпретатора — ним користуються команди з commands.py.
+    """
+    memory = load_memory()
+    sup = _get_supervisor(auto, team, team_size)
+
+    result = sup.run(task, memory)
+    # Додаємо інформацію про проєкт у result, щоб БД її бачила
+    result.setdefault("project", project)
+
+    if learn:
+        crit_tags = result.get("critique_tags", []) or []
+        learn_from_tags(memory, crit_tags)
+        save_memory(memory)
+
+    log_run(result)
+    return result
+
+
+def format_result(result: dict) -> str:
+    """Текстовий вивід результату у форматі CLI."""
+    solver = result.get("solver_agent")
+    team = result.get("team_agents")
+    tags = result.get("critique_tags")
+
+    line = f"[solver: {solver} | tags: {tags}]"
+    if team:
+        line = f"[solver: {solver} | team: {team} | tags: {tags}]"
+    return line + "\n" + str(result["final"])
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--task", type=str, required=True)
@@ -157,34 +217,15 @@ def main():
     # Ініціалізуємо БД (створює таблиці, якщо їх ще немає)
     init_db()
 
-    memory = load_memory()
-    sup = Supervisor(
-        auto_solver=args.auto and not args.team,
-        auto_team=args.team,
+    result = run_task(
+        args.task,
+        auto=args.auto,
+        team=args.team,
         team_size=args.team_size,
+        project=args.project,
+        learn=args.learn,
     )
-
-    result = sup.run(args.task, memory)
-    # Додаємо інформацію про проєкт у result, щоб БД її бачила
-    result.setdefault("project", args.project)
-
-    solver = result.get("solver_agent")
-    team = result.get("team_agents")
-    tags = result.get("critique_tags")
-
-    line = f"[solver: {solver} | tags: {tags}]"
-    if team:
-        line = f"[solver: {solver} | team: {team} | tags: {tags}]"
-    print(line)
-
-    print(result["final"])
-
-    if args.learn:
-        crit_tags = result.get("critique_tags", []) or []
-        learn_from_tags(memory, crit_tags)
-        save_memory(memory)
-
-    log_run(result)
+    print(format_result(result))
 
 
 if __name__ == "__main__":
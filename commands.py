@@ -1,6 +1,5 @@
+import io
 import json
-import sys
-import subprocess
 import sqlite3
 import re
 from pathlib import Path
@@ -831,20 +830,27 @@ def _dataset_show_from_text(text: str) -> str:
     return "\n".join(lines)
 
 
+def _capture_main(main: Callable[..., Any], *args: Any) -> str:
+    """
+    Викликає main() скрипта в поточному процесі й повертає його вивід.
+    Замість `python script.py` — без старту інтерпретатора й повторних імпортів.
+    main пише у переданий out, а не в глобальний sys.stdout: команди виконуються
+    в потоках чату паралельно, і підміна sys.stdout змішала б їхній вивід.
+    """
+    buf = io.StringIO()
+    main(*args, out=buf)
+    return buf.getvalue().strip()
+
+
 def run_progress_report() -> str:
     p = Path("progress_report.py")
     if not p.exists():
         return "progress_report.py не знайдено в проєкті."
     try:
-        res = subprocess.run(
-            [sys.executable, str(p)],
-            capture_output=True,
-            text=True,
-            check=False
-        )
-        out = (res.stdout or "").strip()
-        err = (res.stderr or "").strip()
-        return out if out else (err if err else "Звіт виконано без виводу.")
+        from progress_report import main as progress_main
+
+        out = _capture_main(progress_main)
+        return out if out else "Звіт виконано без виводу."
     except Exception as e:
         return f"Не вдалося запустити progress_report.py: {e}"
 
@@ -854,39 +860,34 @@ def run_eval_runner() -> str:
     if not p.exists():
         return "eval_runner.py не знайдено в проєкті."
     try:
-        res = subprocess.run(
-            [sys.executable, str(p)],
-            capture_output=True,
-            text=True,
-            check=False
-        )
-        out = (res.stdout or "").strip()
-        err = (res.stderr or "").strip()
-        return out if out else (err if err else "Оцінку виконано без виводу.")
+        from eval_runner import main as eval_main
+
+        # порожній argv: не даємо argparse читати sys.argv чату
+        out = _capture_main(eval_main, [])
+        return out if out else "Оцінку виконано без виводу."
     except Exception as e:
         return f"Не вдалося запустити eval_runner.py: {e}"
 
 
+def _run_app_task(task: str) -> str:
+    """
+    Те саме, що `python app.py --task <task> --auto`, але в поточному процесі:
+    без старту нового інтерпретатора та повторного імпорту агентів.
+    """
+    from app import format_result, run_task
+
+    return format_result(run_task(task, auto=True)).strip()
+
+
 def run_trainer_analysis(limit: int = 50) -> str:
     """
     Запустити TrainerAgent через app.py, щоб отримати узагальнений аналіз запусків з БД.
     Використовується як бекенд для чат-команди 'аналіз агентів' / 'аналіз запусків'.
     """
-    p = Path("app.py")
-    if not p.exists():
-        return "app.py не знайдено в проєкті."
-
     task = f"Зроби аналіз {limit} останніх запусків у БД (виклик тренера через команду)."
     try:
-        res = subprocess.run(
-            [sys.executable, str(p), "--task", task, "--auto"],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        out = (res.stdout or "").strip()
-        err = (res.stderr or "").strip()
-        return out if out else (err if err else "Аналіз виконано без виводу.")
+        out = _run_app_task(task)
+        return out if out else "Аналіз виконано без виводу."
     except Exception as e:
         return f"Не вдалося запустити аналіз тренера: {e}"
 
@@ -956,24 +957,12 @@ def apply_trainer_suggestions(limit: int = 50) -> str:
     Запустити TrainerAgent, витягнути з його відповіді config_suggestions
     та оновити agent_configs у БД через set_agent_config.
     """
-    p = Path("app.py")
-    if not p.exists():
-        return "app.py не знайдено в проєкті."
-
     task = f"Зроби аналіз {limit} останніх запусків у БД (оновлення конфігів агентів за тренером)."
     try:
-        res = subprocess.run(
-            [sys.executable, str(p), "--task", task, "--auto"],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
+        text = _run_app_task(task)
     except Exception as e:
         return f"Не вдалося запустити аналіз тренера: {e}"
 
-    out = (res.stdout or "").strip()
-    err = (res.stderr or "").strip()
-    text = out if out else err
     if not text:
         return "Не вдалося отримати відповідь тренера."
 
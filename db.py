@@ -1,5 +1,6 @@
 import json
 import sqlite3
+import threading
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
@@ -7,10 +8,86 @@ from datetime import datetime, timezone
 # Шлях до файлу БД
 DB_PATH = Path(__file__).parent / "runs.db"
 
+# Лічильник змін проєктів/книг у цьому процесі. Кеші читання (server.py)
+# запам'ятовують його і вважають запис застарілим, щойно він змінився.
+_DATA_VERSION = 0
+
+
+def data_version() -> int:
+    """Поточна версія даних проєктів/книг (росте після кожного запису)."""
+    return _DATA_VERSION
+
+
+def _bump_data_version() -> None:
+    global _DATA_VERSION
+    _DATA_VERSION += 1
+
+
+# Пул підключень: функції модуля, як і раніше, беруть get_connection() і
+# закривають conn.close(), але close() лише відкочує незавершену транзакцію й
+# повертає підключення в пул — без нового open() і PRAGMA на кожен запит.
+# Кожен виклик отримує своє підключення (вкладені виклики не ділять транзакцію);
+# підключення, яке не закрили (виняток посеред функції), просто збирає GC.
+_POOL_MAX = 8
+_POOL: List["_PooledConnection"] = []
+_POOL_LOCK = threading.Lock()
+
+
+class _PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection, чий close() повертає його в пул."""
+
+    db_path: Path
+    pooled: bool
+
+    def close(self) -> None:
+        _release(self)
+
+
+def _new_connection() -> _PooledConnection:
+    # check_same_thread=False: з пулу підключення може взяти інший потік
+    # (asyncio.to_thread), але одночасно ним користується лише один виклик
+    conn = sqlite3.connect(DB_PATH, factory=_PooledConnection, check_same_thread=False)
+    conn.db_path = DB_PATH
+    conn.pooled = False
+    # WAL вмикається в init_db (режим зберігається у файлі БД); з ним
+    # synchronous=NORMAL не ризикує цілістю, лише останнім комітом при збої ОС
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def _release(conn: _PooledConnection) -> None:
+    if conn.pooled:
+        return
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        sqlite3.Connection.close(conn)
+        return
+    conn.row_factory = sqlite3.Row
+    with _POOL_LOCK:
+        if conn.db_path == DB_PATH and len(_POOL) < _POOL_MAX:
+            conn.pooled = True
+            _POOL.append(conn)
+            return
+    sqlite3.Connection.close(conn)
+
 
 def get_connection() -> sqlite3.Connection:
     """Повертає підключення до SQLite (створює файл, якщо його ще немає)."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = None
+    with _POOL_LOCK:
+        while _POOL:
+            candidate = _POOL.pop()
+            if candidate.db_path == DB_PATH:
+                conn = candidate
+                break
+            sqlite3.Connection.close(candidate)
+    if conn is None:
+        conn = _new_connection()
+    conn.pooled = False
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -20,6 +97,10 @@ def init_db() -> None:
     conn = get_connection()
     cur = conn.cursor()
 
+    # WAL: читачі не блокуються записом (сервер + chat.py на одному файлі);
+    # режим зберігається в самому файлі БД, тож досить увімкнути один раз
+    cur.execute("PRAGMA journal_mode=WAL")
+
     # Основна таблиця запусків
     cur.execute(
         """
@@ -277,6 +358,10 @@ def init_db() -> None:
         """
     )
 
+    # Індекси для outline та його версії (вибірка глав/сцен книги)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_chapters_book ON chapters(book_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scenes_book ON scenes(book_id)")
+
     conn.commit()
     conn.close()
 
@@ -862,6 +947,7 @@ def ensure_default_project() -> str:
     )
 
     conn.commit()
+    _bump_data_version()
     conn.close()
     return name
 
@@ -934,6 +1020,7 @@ def create_project(
             )
 
     conn.commit()
+    _bump_data_version()
     conn.close()
 
     # Якщо це письменницький проєкт — гарантуємо наявність "книги" у writing_projects
@@ -1004,6 +1091,15 @@ def set_project_setting(project_name: str, key: str, value: str) -> None:
     """
     Встановлює налаштування для проєкту (upsert).
     """
+    set_project_settings(project_name, {key: value})
+
+
+def set_project_settings(project_name: str, values: Dict[str, str]) -> None:
+    """
+    Встановлює кілька налаштувань проєкту (upsert) одним з'єднанням і одним commit.
+    """
+    if not values:
+        return
     project_id = get_project_id_by_name(project_name)
     if project_id is None:
         return
@@ -1016,45 +1112,47 @@ def set_project_setting(project_name: str, key: str, value: str) -> None:
     columns = [row[1] for row in cur.fetchall()]
     has_updated_at = "updated_at" in columns
 
-    if has_updated_at:
-        cur.execute(
-            """
-            UPDATE project_settings
-            SET value = ?, updated_at = ?
-            WHERE project_id = ? AND key = ?
-            """,
-            (value, now, project_id, key),
-        )
-    else:
-        cur.execute(
-            """
-            UPDATE project_settings
-            SET value = ?
-            WHERE project_id = ? AND key = ?
-            """,
-            (value, project_id, key),
-        )
-
-    if cur.rowcount == 0:
+    for key, value in values.items():
         if has_updated_at:
             cur.execute(
                 """
-                INSERT INTO project_settings (project_id, key, value, updated_at)
-                VALUES (?, ?, ?, ?)
+                UPDATE project_settings
+                SET value = ?, updated_at = ?
+                WHERE project_id = ? AND key = ?
                 """,
-                (project_id, key, value, now),
+                (value, now, project_id, key),
             )
         else:
             cur.execute(
                 """
-                INSERT INTO project_settings (project_id, key, value)
-                VALUES (?, ?, ?)
+                UPDATE project_settings
+                SET value = ?
+                WHERE project_id = ? AND key = ?
                 """,
-                (project_id, key, value),
+                (value, project_id, key),
             )
 
+        if cur.rowcount == 0:
+            if has_updated_at:
+                cur.execute(
+                    """
+                    INSERT INTO project_settings (project_id, key, value, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    (project_id, key, value, now),
+                )
+            else:
+                cur.execute(
+                    """
+                    INSERT INTO project_settings (project_id, key, value)
+                    VALUES (?, ?, ?)
+                    """,
+                    (project_id, key, value),
+                )
+
     conn.commit()
     conn.close()
+    _bump_data_version()
 
 
 def get_llm_config(project_name: str) -> Dict[str, str]:
@@ -1475,12 +1573,44 @@ def set_current_project(name: str) -> None:
     )
 
     conn.commit()
+    _bump_data_version()
     conn.close()
 
 
 # ----------------- Writing projects helpers -----------------
 
 
+def get_book_for_project(project_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Лише читання: книга письменницького проєкту (перша за id) або None, якщо
+    проєкт не writing чи книги ще немає — тоді потрібен ensure_writing_project_for_project_id.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT wp.id, wp.title, wp.status, wp.synopsis
+        FROM writing_projects wp
+        JOIN projects p ON p.id = wp.project_id
+        WHERE wp.project_id = ? AND p.type = 'writing'
+        ORDER BY wp.id ASC
+        LIMIT 1
+        """,
+        (project_id,),
+    )
+    row = cur.fetchone()
+    conn.close()
+    if not row:
+        return None
+    return {
+        "id": row["id"],
+        "project_id": project_id,
+        "title": row["title"],
+        "status": row["status"],
+        "synopsis": row["synopsis"],
+    }
+
+
 def ensure_writing_project_for_project_id(
     project_id: int,
     title: Optional[str] = None,
@@ -1534,6 +1664,10 @@ def ensure_writing_project_for_project_id(
             "status": wrow["status"],
             "synopsis": wrow["synopsis"],
         }
+        if ptype != "writing":
+            # зміна типу проєкту вище — теж запис, його треба зафіксувати
+            conn.commit()
+            _bump_data_version()
         conn.close()
         return result
 
@@ -1547,6 +1681,7 @@ def ensure_writing_project_for_project_id(
     book_id = cur.lastrowid
 
     conn.commit()
+    _bump_data_version()
     conn.close()
 
     return {
@@ -1641,6 +1776,7 @@ def create_writing_project(
     book_id = cur.lastrowid
 
     conn.commit()
+    _bump_data_version()
     conn.close()
 
     return {
@@ -1770,6 +1906,7 @@ def add_chapter(
     chapter_id = cur.lastrowid
 
     conn.commit()
+    _bump_data_version()
     conn.close()
 
     return {
@@ -1832,6 +1969,7 @@ def add_scene(
     scene_id = cur.lastrowid
 
     conn.commit()
+    _bump_data_version()
     conn.close()
 
     return {
@@ -1846,6 +1984,37 @@ def add_scene(
     }
 
 
+def get_book_version(book_id: int) -> Optional[str]:
+    """
+    Дешевий "відбиток" книги для кешування outline: змінюється, коли змінюються
+    книга, її глави чи сцени (кількість, max(id), max(updated_at)).
+
+    Повертає None, якщо книги немає.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT
+            wp.updated_at,
+            p.name,
+            (SELECT COUNT(*) || ':' || IFNULL(MAX(id), 0) || ':' || IFNULL(MAX(updated_at), '')
+             FROM chapters WHERE book_id = wp.id),
+            (SELECT COUNT(*) || ':' || IFNULL(MAX(id), 0) || ':' || IFNULL(MAX(updated_at), '')
+             FROM scenes WHERE book_id = wp.id)
+        FROM writing_projects wp
+        LEFT JOIN projects p ON p.id = wp.project_id
+        WHERE wp.id = ?
+        """,
+        (book_id,),
+    )
+    row = cur.fetchone()
+    conn.close()
+    if not row:
+        return None
+    return "|".join(str(v or "") for v in row)
+
+
 def get_book_outline(book_id: int) -> Dict[str, Any]:
     """
     Повертає структуру книги: заголовок + список глав і сцен.
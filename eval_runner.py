@@ -1,5 +1,6 @@
 import argparse
 import json
+import sys
 from collections import Counter
 from pathlib import Path
 
@@ -62,11 +63,14 @@ def run_mode(mode: str, tasks, memory):
     return results, tag_counter, tagged_tasks
 
 
-def main():
+def main(argv=None, out=None):
+    """Друкує підсумок у out (за замовчуванням sys.stdout)."""
+    if out is None:
+        out = sys.stdout
     parser = argparse.ArgumentParser()
     parser.add_argument("--mode", choices=["auto", "team", "both"], default="both")
     parser.add_argument("--tasks-file", type=str, default="")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     memory = load_memory()
 
@@ -91,24 +95,24 @@ def main():
     out_path = EVAL_DIR / "latest_eval.json"
     out_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
 
-    print("=== Evaluation ===")
-    print(f"Tasks: {len(tasks)}")
-    print(f"Saved: {out_path}")
+    print("=== Evaluation ===", file=out)
+    print(f"Tasks: {len(tasks)}", file=out)
+    print(f"Saved: {out_path}", file=out)
 
     for m in modes:
-        print(f"\n--- Mode: {m} ---")
+        print(f"\n--- Mode: {m} ---", file=out)
         tags = summary["modes"][m]["tag_stats"]
         if not tags:
-            print("No critique tags found.")
+            print("No critique tags found.", file=out)
         else:
             for k, v in sorted(tags.items(), key=lambda x: (-x[1], x[0])):
-                print(f"{k}: {v}")
+                print(f"{k}: {v}", file=out)
 
         tt = summary["modes"][m]["tagged_tasks"]
         if tt:
-            print("\nTagged examples:")
+            print("\nTagged examples:", file=out)
             for item in tt:
-                print(f"- {item['task']} | tags: {item['tags']}")
+                print(f"- {item['task']} | tags: {item['tags']}", file=out)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import json
 import os
 import socket
+from typing import Callable, Optional
 from urllib import error, request
 
 
@@ -8,41 +9,79 @@ def env_default_base_url() -> str:
     return os.getenv("LMSTUDIO_BASE_URL", "http://127.0.0.1:1234/v1")
 
 
+# Власний opener модуля (будується один раз): глобальний opener urllib
+# (install_opener) не чіпаємо — його може поставити сам застосунок
+_OPENER: Optional[request.OpenerDirector] = None
+
+
+def _opener() -> request.OpenerDirector:
+    global _OPENER
+    if _OPENER is None:
+        _OPENER = request.build_opener()
+    return _OPENER
+
+
+def warmup() -> None:
+    """Робить заздалегідь те, що urllib робить ліниво на першому запиті."""
+    _opener()
+    # кодування хоста в http.client тягне імпорт encodings.idna
+    "localhost".encode("idna")
+
+
 def _truncate_text(text: str, limit: int = 2000) -> str:
     if len(text) <= limit:
         return text
     return text[:limit] + "... (truncated)"
 
 
-def chat_openai_compat(
-    *,
+def _completions_request(
     base_url: str,
     model: str,
     messages: list[dict],
-    temperature: float = 0.2,
-    max_tokens: int | None = None,
-    timeout_s: int = 120,
-) -> str:
+    temperature: float,
+    max_tokens: int | None,
+    stream: bool,
+) -> request.Request:
     url = base_url.rstrip("/") + "/chat/completions"
     payload: dict = {
         "model": model,
         "messages": messages,
         "temperature": temperature,
-        "stream": False,
+        "stream": stream,
     }
     if max_tokens is not None:
         payload["max_tokens"] = max_tokens
 
     data = json.dumps(payload).encode("utf-8")
-    req = request.Request(
+    return request.Request(
         url,
         data=data,
         headers={"Content-Type": "application/json"},
         method="POST",
     )
 
+
+def chat_openai_compat(
+    *,
+    base_url: str,
+    model: str,
+    messages: list[dict],
+    temperature: float = 0.2,
+    max_tokens: int | None = None,
+    timeout_s: int = 120,
+    on_delta: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Один chat completion; повертає повний текст відповіді.
+
+    Якщо передано on_delta — запит іде зі stream=true, і кожен шматок тексту
+    віддається в on_delta щойно прийшов (для SSE у UI); повернення те саме.
+    """
+    req = _completions_request(base_url, model, messages, temperature, max_tokens, on_delta is not None)
+
     try:
-        with request.urlopen(req, timeout=timeout_s) as resp:
+        with _opener().open(req, timeout=timeout_s) as resp:
+            if on_delta is not None:
+                return _read_stream(resp, on_delta)
             body_bytes = resp.read()
     except error.HTTPError as exc:
         body = exc.read().decode("utf-8", errors="replace")
@@ -71,3 +110,31 @@ def chat_openai_compat(
         )
 
     return content
+
+
+def _read_stream(resp, on_delta: Callable[[str], None]) -> str:
+    """Читає SSE-відповідь OpenAI-compatible API (`data: {...}` ... `data: [DONE]`)."""
+    parts: list[str] = []
+    for raw in resp:
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line.startswith("data:"):
+            continue
+        chunk = line[5:].strip()
+        if chunk == "[DONE]":
+            break
+        try:
+            data = json.loads(chunk)
+        except json.JSONDecodeError as exc:
+            raise ValueError(
+                f"Invalid JSON stream chunk: {_truncate_text(chunk)}"
+            ) from exc
+        choices = data.get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            parts.append(delta)
+            on_delta(delta)
+
+    content = "".join(parts)
+    if not content:
+        raise ValueError("Empty response content (stream)")
+    return content
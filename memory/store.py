@@ -2,6 +2,11 @@ import json
 from pathlib import Path
 from typing import Any, Dict
 
+try:
+    import orjson
+except ImportError:  # orjson опційний, stdlib json як фолбек
+    orjson = None  # type: ignore
+
 MEMORY_PATH = Path("memory/memory.json")
 
 DEFAULT_MEMORY = {
@@ -12,7 +17,8 @@ DEFAULT_MEMORY = {
 
 def load_memory() -> Dict[str, Any]:
     if MEMORY_PATH.exists():
-        data = json.loads(MEMORY_PATH.read_text(encoding="utf-8"))
+        raw = MEMORY_PATH.read_bytes()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
         # backward compatible merge
         merged = {**DEFAULT_MEMORY, **data}
         merged["flags"] = {**DEFAULT_MEMORY["flags"], **(data.get("flags") or {})}
@@ -23,6 +29,10 @@ def load_memory() -> Dict[str, Any]:
 
 def save_memory(mem: Dict[str, Any]) -> None:
     MEMORY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    if orjson is not None:
+        # orjson одразу віддає UTF-8 bytes — пишемо їх одним write без перекодування
+        MEMORY_PATH.write_bytes(orjson.dumps(mem, option=orjson.OPT_INDENT_2))
+        return
     MEMORY_PATH.write_text(
         json.dumps(mem, ensure_ascii=False, indent=2),
         encoding="utf-8"
@@ -1,43 +1,118 @@
+import hashlib
 import json
-from copy import deepcopy
+import os
+import sys
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+
+try:
+    import orjson
+except ImportError:  # orjson опційний, stdlib json як фолбек
+    orjson = None  # type: ignore
 
 from agents.supervisor import Supervisor
 from memory.store import load_memory, save_memory, set_flag
 
 
+@lru_cache(maxsize=8)
+def _load_tasks_cached(path, mtime_ns):
+    # Читаємо файл одним буфером і парсимо; кеш інвалідовується зміною mtime
+    with open(path, "rb") as f:
+        raw = f.read()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    return tuple(data.get("tasks", []))
+
+
 def load_tasks(path="tests/sample_tasks.json"):
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data.get("tasks", [])
+    return list(_load_tasks_cached(path, os.stat(path).st_mtime_ns))
+
+
+def _memkey(memory):
+    if orjson is not None:
+        raw = orjson.dumps(memory, option=orjson.OPT_SORT_KEYS)
+    else:
+        raw = json.dumps(memory, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def _run_uncached(sup, tasks, memory):
+    if os.getenv("PARALLEL_SUITE", "1") == "1" and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=min(32, len(tasks))) as ex:
+            return list(ex.map(lambda task: sup.run(task, memory), tasks))
+    return sup.run_batch(tasks, memory)
 
 
-def run_suite(tasks, memory):
-    """Run all tasks with given memory and return tag stats."""
-    sup = Supervisor()
-    stats = Counter()
-    results = []
+_SUPERVISOR = None
 
-    for task in tasks:
-        res = sup.run(task, memory)
-        tags = res.get("critique_tags", []) or []
-        stats.update(tags)
-        results.append(res)
+
+def _get_supervisor():
+    """Один Supervisor на процес: він не тримає стану між run()."""
+    global _SUPERVISOR
+    if _SUPERVISOR is None:
+        _SUPERVISOR = Supervisor()
+    return _SUPERVISOR
+
+
+def run_suite(tasks, memory, sup=None, cache=None):
+    """Run all tasks with given memory and return tag stats.
+
+    Tasks are independent and mostly wait on LLM I/O, so by default they run
+    in a thread pool (PARALLEL_SUITE=0 switches back to a sequential loop).
+    Supervisor keeps no per-run state and agents only read memory, so one
+    instance is shared by all threads; results keep the order of `tasks`.
+
+    If `cache` (a dict) is given, results are memoized in it per (task, memory
+    hash): a suite re-run with the same memory within one report (e.g. AFTER
+    when learning changed nothing) skips the Supervisor. The cache belongs to
+    the caller, so agent configs changed between reports never leak in stale
+    results; callers get copies of the cached dicts.
+    """
+    sup = sup or _get_supervisor()
+    if cache is None:
+        cache = {}
+    mkey = _memkey(memory)
+    results = [cache.get((task, mkey)) for task in tasks]
+    missing = [i for i, res in enumerate(results) if res is None]
+
+    if missing:
+        fresh = _run_uncached(sup, [tasks[i] for i in missing], memory)
+        for i, res in zip(missing, fresh):
+            results[i] = res
+            cache[(tasks[i], mkey)] = res
+    results = [dict(res) for res in results]
+
+    # Один Counter по всіх тегах одразу (C-шлях _count_elements), без update на задачу
+    stats = Counter(chain.from_iterable(res.get("critique_tags") or () for res in results))
 
     return stats, results
 
 
-def simulate_learning(tasks, memory):
+def simulate_learning(tasks, memory, results=None, sup=None):
     """
     One simple learning pass:
     if Critic tags 'structure' -> set force_structure flag.
+
+    If `results` of a run over the same tasks with the same memory are given
+    (e.g. the baseline run), learn from their tags instead of re-running:
+    until the first 'structure' tag the learning pass sees exactly the same
+    memory as that run, and after it the flag is already set.
     """
-    sup = Supervisor()
-    for task in tasks:
-        res = sup.run(task, memory)
-        tags = res.get("critique_tags", []) or []
+    if results is None:
+        sup = sup or _get_supervisor()
+        for task in tasks:
+            res = sup.run(task, memory)
+            tags = res.get("critique_tags") or []
+            if "structure" in tags:
+                set_flag(memory, "force_structure", True)
+        return memory
+
+    for res in results:
+        tags = res.get("critique_tags") or []
         if "structure" in tags:
             set_flag(memory, "force_structure", True)
+            break
     return memory
 
 
@@ -49,52 +124,62 @@ def pct_change(before, after):
     return ((before - after) / before) * 100.0
 
 
-def main(write_memory=False):
+def main(write_memory=False, out=None):
+    """Друкує звіт у out (за замовчуванням sys.stdout)."""
+    if out is None:
+        out = sys.stdout
     tasks = load_tasks()
     if not tasks:
-        print("No tasks found in tests/sample_tasks.json")
+        print("No tasks found in tests/sample_tasks.json", file=out)
         return
 
     # Load current memory from disk
     mem_disk = load_memory()
 
     # ---- Baseline memory (no flags) ----
-    mem_base = deepcopy(mem_disk)
-    mem_base["flags"] = {}  # clear learned flags
+    # Agents only read memory and learning touches just "flags",
+    # so a shallow copy with a fresh flags dict is enough (no deepcopy).
+    mem_base = {**mem_disk, "flags": {}}  # clear learned flags
 
     # ---- Run BEFORE ----
-    before_stats, _ = run_suite(tasks, mem_base)
+    sup = _get_supervisor()
+    # кеш прогонів — лише на цей звіт (BEFORE/AFTER з тією ж пам'яттю)
+    run_cache = {}
+    before_stats, before_results = run_suite(tasks, mem_base, sup, run_cache)
 
-    # ---- Simulate learning in-memory ----
-    mem_learned = deepcopy(mem_base)
-    mem_learned = simulate_learning(tasks, mem_learned)
+    # ---- Simulate learning in-memory (reuses the BEFORE pass) ----
+    mem_learned = {**mem_base, "flags": dict(mem_base["flags"])}
+    mem_learned = simulate_learning(tasks, mem_learned, results=before_results, sup=sup)
 
     # ---- Run AFTER ----
-    after_stats, _ = run_suite(tasks, mem_learned)
+    after_stats, _ = run_suite(tasks, mem_learned, sup, run_cache)
 
     # ---- Report ----
     all_tags = sorted(set(before_stats.keys()) | set(after_stats.keys()))
-    print("=== Progress Report ===")
-    print(f"Tasks: {len(tasks)}\n")
+    print("=== Progress Report ===", file=out)
+    print(f"Tasks: {len(tasks)}\n", file=out)
 
     if not all_tags:
-        print("No critique tags detected in either run.")
+        print("No critique tags detected in either run.", file=out)
     else:
-        print("Tag stats (before -> after):")
-        for t in all_tags:
-            b = before_stats.get(t, 0)
-            a = after_stats.get(t, 0)
-            change = pct_change(b, a)
-            sign = "+" if change >= 0 else ""
-            print(f"  {t}: {b} -> {a}  ({sign}{change:.1f}% improvement)")
-
-    print("\nLearned flags (simulation):")
-    print(mem_learned.get("flags", {}))
+        print("Tag stats (before -> after):", file=out)
+        # Counter повертає 0 для відсутніх тегів, тож рахуємо колонки цілком
+        # (map без викликів .get на тег) і друкуємо звіт одним write
+        before = [before_stats[t] for t in all_tags]
+        after = [after_stats[t] for t in all_tags]
+        changes = map(pct_change, before, after)
+        print("\n".join(
+            f"  {t}: {b} -> {a}  ({'+' if c >= 0 else ''}{c:.1f}% improvement)"
+            for t, b, a, c in zip(all_tags, before, after, changes)
+        ), file=out)
+
+    print("\nLearned flags (simulation):", file=out)
+    print(mem_learned.get("flags", {}), file=out)
 
     # Optionally persist learned memory to disk
     if write_memory:
         save_memory(mem_learned)
-        print("\nSaved learned memory to memory/memory.json")
+        print("\nSaved learned memory to memory/memory.json", file=out)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+"""Постійний процес для прогонів pytest (див. tools_allowlist.run_pytest).
+
+pytest і його плагіни імпортуються тут один раз; кожен прогін — fork цього
+однопотокового процесу, тож старт інтерпретатора та імпорт pytest не
+повторюються, а модулі самого репо імпортуються в дочірньому процесі заново
+(тести завжди бачать свіжий код).
+
+Протокол — JSON-рядки: на stdin {"cwd", "args", "timeout_s", "limit"},
+на stdout {"code", "stdout", "stderr"}; з виводу повертається лише те, що
+може потрапити в перші limit + 1 символів.
+"""
+from __future__ import annotations
+
+import json
+import os
+import signal
+import sys
+import tempfile
+
+try:
+    import pytest
+except ImportError:  # як і `python -m pytest` без pytest — помилка на кожен запит
+    pytest = None
+
+if pytest is not None:
+    # Плагіни з entry points теж прогріваємо: pytest.main у дочірньому процесі
+    # знайде їх уже імпортованими
+    try:
+        from importlib.metadata import entry_points
+
+        for _ep in entry_points(group="pytest11"):
+            try:
+                _ep.load()
+            except Exception:
+                pass
+    except Exception:
+        pass
+
+# Прогріті плагіни pytest уже не може переписати (assert rewrite) — це очікувано;
+# тести й conftest репо імпортуються лише в дочірньому процесі й переписуються як звичайно
+_QUIET_ARGS = ["-W", "ignore::pytest.PytestAssertRewriteWarning"]
+
+def _child(req: dict, out_fd: int, err_fd: int) -> None:
+    """Тіло дочірнього процесу; ніколи не повертається."""
+    code = 1
+    try:
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(out_fd, 1)
+        os.dup2(err_fd, 2)
+        signal.alarm(int(req.get("timeout_s") or 0))
+        cwd = req.get("cwd") or os.getcwd()
+        os.chdir(cwd)
+        # як у `python -m pytest`: корінь репо першим у sys.path
+        sys.path[0] = cwd
+        code = int(pytest.main(_QUIET_ARGS + list(req.get("args") or [])))
+    except BaseException as exc:
+        print(f"{type(exc).__name__}: {exc}", file=sys.stderr)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _read_head(f, limit: int) -> str:
+    # UTF-8 символ — до 4 байтів: довшого префікса _truncate однаково не покаже
+    f.seek(0)
+    data = f.read(4 * (limit + 1)) if limit > 0 else f.read()
+    return data.decode("utf-8", errors="replace")
+
+
+def _run(req: dict) -> dict:
+    if pytest is None:
+        return {"code": 1, "stdout": "", "stderr": "No module named pytest"}
+
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        pid = os.fork()
+        if pid == 0:
+            _child(req, out.fileno(), err.fileno())
+        _, status = os.waitpid(pid, 0)
+        if os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGALRM:
+            return {"code": "timeout", "stdout": "", "stderr": f"Timeout ({req.get('timeout_s')}s)"}
+        limit = int(req.get("limit") or 0)
+        return {
+            "code": os.waitstatus_to_exitcode(status),
+            "stdout": _read_head(out, limit),
+            "stderr": _read_head(err, limit),
+        }
+
+
+def main() -> None:
+    for line in sys.stdin:
+        try:
+            resp = _run(json.loads(line))
+        except Exception as exc:
+            resp = {"code": 1, "stdout": "", "stderr": f"{type(exc).__name__}: {exc}"}
+        sys.stdout.write(json.dumps(resp, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,260 @@
 from __future__ import annotations
 
+import asyncio
+import mmap
+import os
+import re
+import shutil
+import signal
 import subprocess
-from typing import Tuple, Dict
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# ripgrep шукаємо один раз при імпорті; якщо його немає — працюємо через grep
+_RG = shutil.which("rg")
+# git теж резолвимо один раз: абсолютний шлях знімає пошук по PATH на кожен spawn.
+# --no-optional-locks: status/diff лише читають і не переписують index
+# (без index.lock і без запису оновленої stat-інформації на кожен запит)
+_GIT_BIN = shutil.which("git") or "git"
+_GIT = [_GIT_BIN, "--no-optional-locks"]
+# Абсолютний шлях також умова, за якої subprocess бере posix_spawn
+# (vfork, без копіювання таблиць сторінок великого процесу сервера) замість fork+exec
+_GREP = shutil.which("grep") or "grep"
+
+_ELLIPSIS = "…"
+
+# Вивід команд декодуємо як UTF-8 явно, а C.UTF-8 робить повідомлення git/grep
+# незалежними від локалі користувача. GIT_OPTIONAL_LOCKS=0 — те саме, що
+# --no-optional-locks, для будь-якої git-команди, запущеної звідси.
+_CMD_ENV_OVERRIDES = {"LANG": "C.UTF-8", "LC_ALL": "C.UTF-8", "GIT_OPTIONAL_LOCKS": "0"}
+
+
+def _cmd_env() -> dict[str, str]:
+    return {**os.environ, **_CMD_ENV_OVERRIDES}
 
 
 def _truncate(text: str, limit: int = 8000) -> str:
-    text = text or ""
-    if len(text) <= limit:
-        return text
-    return text[:limit].rstrip() + "…"
+    """text.strip(), обрізаний до limit символів (з "…" в кінці).
+
+    Пробіли з країв шукаються індексами, а зріз робиться один: вивід команд
+    часто довший за limit, і копія всього тексту заради strip() зайва.
+    """
+    if not text:
+        return ""
+    n = len(text)
+    start, end = 0, n
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if end - start <= limit:
+        # без пробілів з країв text[0:n] — це сам text, без копії
+        return text[start:end]
+    i = start + limit
+    while i > start and text[i - 1].isspace():
+        i -= 1
+    return text[start:i] + _ELLIPSIS
+
+
+# Скільки символів виводу команди взагалі показуємо (див. _truncate)
+_OUT_LIMIT = 8000
+_READ_CHUNK = 64 * 1024
+
+
+def _over_limit(buf: bytearray, limit: int) -> bool:
+    # Символ UTF-8 — від 1 до 4 байтів (битий байт при errors="replace" — теж
+    # символ), тож декодувати, щоб порахувати символи, треба лише між цими межами
+    n = len(buf)
+    if n <= limit:
+        return False
+    if n > 4 * limit:
+        return True
+    return len(str(buf, "utf-8", "replace")) > limit
+
+
+def _decode_head(buf: bytes | bytearray, limit: int) -> str:
+    """Декодує лише ті байти, що можуть потрапити в перші limit + 1 символів.
+
+    Хвіст, який _truncate однаково відкине, не декодується і не копіюється
+    (memoryview); обірваний символ на межі стає "\ufffd" вже за межею limit.
+    """
+    return str(memoryview(buf)[: 4 * (limit + 1)], "utf-8", "replace")
+
+
+def _run_cmd(cmd: list[str], timeout_s: int = 20, limit: int = _OUT_LIMIT) -> tuple[int, str, str]:
+    """Запускає команду, зберігаючи не більше ~limit символів stdout/stderr.
+
+    Довший вивід все одно обрізається _truncate, тож процес зупиняється, щойно
+    stdout перевищив limit, а не буферизується повністю. Обрізаний вивід
+    вважається успішним (код 0): код вбитого процесу нічого не означає.
+    """
+    code, out, err, truncated = _run_cmd_head(cmd, limit, timeout_s=timeout_s)
+    return (0 if truncated else code), out, err
+
+
+async def _read_capped(stream: asyncio.StreamReader, limit: int) -> tuple[bytes, bool]:
+    """Читає stream, доки вивід не перевищить limit символів; повертає (bytes, truncated)."""
+    buf = bytearray()
+    while True:
+        chunk = await stream.read(_READ_CHUNK)
+        if not chunk:
+            return bytes(buf), False
+        buf += chunk
+        if _over_limit(buf, limit):
+            return bytes(buf), True
+
+
+async def _drain_capped(stream: asyncio.StreamReader, limit: int) -> bytes:
+    """Читає stream до кінця (щоб процес не заблокувався), зберігаючи лише початок."""
+    cap = 4 * (limit + 1)
+    buf = bytearray()
+    while True:
+        chunk = await stream.read(_READ_CHUNK)
+        if not chunk:
+            return bytes(buf)
+        if len(buf) < cap:
+            buf += chunk[: cap - len(buf)]
+
+
+async def _communicate_capped(proc: asyncio.subprocess.Process, limit: int) -> tuple[int, str, str, bool]:
+    """Асинхронний аналог _run_cmd_head для вже запущеного процесу."""
+
+    async def _read_out() -> tuple[bytes, bool]:
+        out, truncated = await _read_capped(proc.stdout, limit)  # type: ignore[arg-type]
+        if truncated:
+            _kill_async(proc)
+        return out, truncated
+
+    (out, truncated), err = await asyncio.gather(
+        _read_out(),
+        _drain_capped(proc.stderr, limit),  # type: ignore[arg-type]
+    )
+    await proc.wait()
+    return (
+        proc.returncode or 0,
+        _decode_head(out, limit),
+        err.decode("utf-8", errors="replace"),
+        truncated,
+    )
+
+
+async def _run_cmd_head_async(cmd: list[str], limit: int, timeout_s: int = 20) -> tuple[int, str, str, bool]:
+    """Неблокуючий аналог _run_cmd_head: (code, out, err, truncated)."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        close_fds=False,
+        env=_cmd_env(),
+    )
+    try:
+        return await asyncio.wait_for(_communicate_capped(proc, limit), timeout=timeout_s)
+    except asyncio.TimeoutError:
+        _kill_async(proc)
+        await proc.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout_s)
+    except BaseException:
+        _kill_async(proc)
+        raise
+
+
+async def _run_cmd_async(cmd: list[str], timeout_s: int = 20, limit: int = _OUT_LIMIT) -> tuple[int, str, str]:
+    """Неблокуючий аналог _run_cmd для коду, що працює в event loop-і."""
+    code, out, err, truncated = await _run_cmd_head_async(cmd, limit, timeout_s)
+    return (0 if truncated else code), out, err
+
+
+def _kill_async(proc: asyncio.subprocess.Process) -> None:
+    if proc.returncode is not None:
+        return
+    try:
+        if os.name == "posix":
+            # Не proc.kill(): Popen.send_signal спершу робить poll() і може сам
+            # забрати код завершення вже мертвого процесу — тоді child watcher
+            # asyncio отримує ECHILD ("Unknown child process pid ...")
+            os.kill(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass
+
 
+def _run_cmd_head(
+    cmd: list[str], limit: int, timeout_s: int = 20, stop_early: bool = True
+) -> tuple[int, str, str, bool]:
+    """Запускає команду й читає stdout лише доки він не перевищить limit символів.
 
-def _run_cmd(cmd: list[str], timeout_s: int = 20) -> tuple[int, str, str]:
-    proc = subprocess.run(
+    Якщо виводу більше — процес зупиняється, а хвіст не буферизується в пам'яті;
+    stderr читається паралельно в потоці й теж обрізається.
+    Повертає (code, out, err, truncated); при truncated=True код повернення не важливий.
+    З stop_early=False процес доходить до кінця (потрібен його код), а зайвий
+    вивід лише вичитується й відкидається.
+    """
+    err_cap = 4 * (limit + 1)
+    err_buf = bytearray()
+    out_buf = bytearray()
+    truncated = False
+    timed_out = threading.Event()
+
+    with subprocess.Popen(
         cmd,
-        capture_output=True,
-        text=True,
-        timeout=timeout_s,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        close_fds=False,
+        env=_cmd_env(),
+    ) as proc:
+
+        def _kill() -> None:
+            timed_out.set()
+            proc.kill()
+
+        def _drain_stderr() -> None:
+            fd = proc.stderr.fileno()  # type: ignore[union-attr]
+            while True:
+                chunk = os.read(fd, _READ_CHUNK)
+                if not chunk:
+                    return
+                if len(err_buf) < err_cap:
+                    err_buf.extend(chunk[: err_cap - len(err_buf)])
+
+        timer = threading.Timer(timeout_s, _kill)
+        err_thread = threading.Thread(target=_drain_stderr, daemon=True)
+        timer.start()
+        err_thread.start()
+        try:
+            fd = proc.stdout.fileno()  # type: ignore[union-attr]
+            while True:
+                chunk = os.read(fd, _READ_CHUNK)
+                if not chunk:
+                    break
+                if truncated:
+                    continue
+                out_buf += chunk
+                if _over_limit(out_buf, limit):
+                    truncated = True
+                    if stop_early:
+                        proc.kill()
+                        break
+            err_thread.join()
+            proc.wait()
+        finally:
+            timer.cancel()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout_s)
+    return (
+        proc.returncode,
+        _decode_head(out_buf, limit),
+        err_buf.decode("utf-8", errors="replace"),
+        truncated,
     )
-    return proc.returncode, proc.stdout or "", proc.stderr or ""
 
 
 def _cmd_error(cmd_str: str, code: int, out: str, err: str) -> str:
-    out = _truncate(out.strip())
-    err = _truncate(err.strip())
+    out = _truncate(out)
+    err = _truncate(err)
     if err:
         return f"{cmd_str} failed (code={code}): {err}"
     if out:
@@ -31,47 +262,248 @@ def _cmd_error(cmd_str: str, code: int, out: str, err: str) -> str:
     return f"{cmd_str} failed (code={code})"
 
 
-def git_status() -> dict:
-    cmd = ["git", "status", "--porcelain=v1", "-b"]
-    code, out, err = _run_cmd(cmd, timeout_s=20)
+# Короткий кеш результатів git/пошуку: UI опитує /dev/git/* часто, а репозиторій
+# між запитами здебільшого не змінюється. Ключ — mtime .git/HEAD, .git/index і
+# .git/refs/heads (checkout, add, commit); правки робочих файлів index не чіпають,
+# тож їх відображення обмежує TTL. Інструменти агента (tools_allowlist) кеш
+# обходять (cached=False), а зміни дерева через них його скидають.
+GIT_CACHE_TTL_S = float(os.getenv("GIT_CACHE_TTL_S", "2"))
+_GIT_CACHE_MAX = 64
+_GIT_CACHE: Dict[tuple, Tuple[float, tuple, dict]] = {}
+# Росте після кожної зміни дерева через нас (invalidate_caches): входить у
+# snapshot, тож результат, порахований до зміни, вже не потрапить у кеш як свіжий
+_CACHE_GEN = 0
+
+
+def invalidate_caches() -> int:
+    """Скидає кеші git/пошуку й індекс файлів — після змін робочого дерева
+    (git apply, тести). Повертає кількість скинутих записів."""
+    global _CACHE_GEN
+    _CACHE_GEN += 1
+    dropped = len(_GIT_CACHE)
+    _GIT_CACHE.clear()
+    with _SCAN_LOCK:
+        dropped += len(_SCAN_CACHE)
+        _SCAN_CACHE.clear()
+    with _FILE_INDEX_LOCK:
+        dropped += len(_FILE_INDEX)
+        _FILE_INDEX.clear()
+    return dropped
+
+
+def cache_stats() -> dict:
+    """Кількість записів у кешах git, пошуку та індексі файлів (для /dev/metrics)."""
+    with _SCAN_LOCK:
+        scan = len(_SCAN_CACHE)
+    with _FILE_INDEX_LOCK:
+        files = len(_FILE_INDEX)
+    return {"git": len(_GIT_CACHE), "scan": scan, "file_index": files}
+
+
+def _repo_snapshot() -> Optional[tuple]:
+    try:
+        return (
+            _CACHE_GEN,
+            os.stat(".git/HEAD").st_mtime_ns,
+            os.stat(".git/index").st_mtime_ns,
+            os.stat(".git/refs/heads").st_mtime_ns,
+        )
+    except OSError:
+        # не звичайний checkout (worktree, нема index) — не кешуємо
+        return None
+
+
+def _git_cache_get(key: tuple) -> Tuple[Optional[tuple], Optional[dict]]:
+    snap = _repo_snapshot()
+    if snap is None or GIT_CACHE_TTL_S <= 0:
+        return None, None
+    hit = _GIT_CACHE.get(key)
+    if hit is not None and hit[0] > time.monotonic() and hit[1] == snap:
+        return snap, hit[2]
+    return snap, None
+
+
+def _git_cache_put(key: tuple, snap: Optional[tuple], value: dict) -> dict:
+    if snap is not None and GIT_CACHE_TTL_S > 0:
+        if len(_GIT_CACHE) >= _GIT_CACHE_MAX:
+            _GIT_CACHE.clear()
+        _GIT_CACHE[key] = (time.monotonic() + GIT_CACHE_TTL_S, snap, value)
+    return value
+
+
+# Формат лишається porcelain v1 -b: його читають люди (UI) і HeadAgent.
+# --no-ahead-behind прибирає revwalk до upstream (у заголовку гілки лише
+# "[different]"); на великих репо untracked-скан можна вимкнути: GIT_STATUS_UNTRACKED=no
+GIT_STATUS_UNTRACKED = os.getenv("GIT_STATUS_UNTRACKED", "normal")
+_GIT_STATUS_CMD = [
+    *_GIT,
+    "status",
+    "--porcelain=v1",
+    "-b",
+    "--no-ahead-behind",
+    f"--untracked-files={GIT_STATUS_UNTRACKED}",
+]
+
+
+def _status_result(code: int, out: str, err: str) -> dict:
     if code != 0:
         raise RuntimeError(_cmd_error("git status", code, out, err))
     return {
-        "stdout": _truncate(out.strip()),
-        "stderr": _truncate(err.strip()),
+        "stdout": _truncate(out),
+        "stderr": _truncate(err),
     }
 
 
-def git_diff(limit: int = 8000) -> dict:
-    cmd = ["git", "diff"]
-    code, out, err = _run_cmd(cmd, timeout_s=20)
+def git_status(cached: bool = True) -> dict:
+    """cached=False — без кешу (шлях інструментів агента: потрібен стан саме зараз)."""
+    if not cached:
+        return _status_result(*_run_cmd(_GIT_STATUS_CMD, timeout_s=20))
+    snap, data = _git_cache_get(("status",))
+    if data is not None:
+        return data
+    return _git_cache_put(("status",), snap, _status_result(*_run_cmd(_GIT_STATUS_CMD, timeout_s=20)))
+
+
+async def git_status_async() -> dict:
+    snap, data = _git_cache_get(("status",))
+    if data is not None:
+        return data
+    return _git_cache_put(("status",), snap, _status_result(*await _run_cmd_async(_GIT_STATUS_CMD, timeout_s=20)))
+
+
+def _diff_result(code: int, out: str, err: str, limit: int) -> dict:
     if code != 0:
         raise RuntimeError(_cmd_error("git diff", code, out, err))
+    return {
+        "truncated": False,
+        "diff": _truncate(out, limit=limit),
+        "stderr": _truncate(err),
+    }
 
-    if len(out) > limit:
-        stat_code, stat_out, stat_err = _run_cmd(["git", "diff", "--stat"], timeout_s=20)
-        if stat_code != 0:
-            raise RuntimeError(_cmd_error("git diff --stat", stat_code, stat_out, stat_err))
-        return {
-            "truncated": True,
-            "stat": _truncate(stat_out.strip()),
-            "stderr": _truncate(stat_err.strip()),
-        }
 
+def _diff_stat_result(code: int, out: str, err: str, truncated: bool = False) -> dict:
+    """Результат `git diff --stat` (аргументи — як повертає _run_cmd_head).
+
+    "stat_only" позначає, що замість diff повернуто зведення по файлах;
+    "truncated" — чи обрізано сам вивід --stat (процесом або _truncate).
+    """
+    if code != 0 and not truncated:
+        raise RuntimeError(_cmd_error("git diff --stat", code, out, err))
+    stat = _truncate(out)
     return {
-        "truncated": False,
-        "diff": _truncate(out.strip(), limit=limit),
-        "stderr": _truncate(err.strip()),
+        "stat_only": True,
+        "truncated": truncated or len(stat) != len(out.strip()),
+        "stat": stat,
+        "stderr": _truncate(err),
     }
 
 
-def repo_search(query: str, max_matches: int = 50) -> dict:
-    q = (query or "").strip()
-    if len(q) < 2:
-        raise ValueError("query too short")
+# --no-color/--no-ext-diff: вивід не роздувається ANSI-кодами (color.ui=always у
+# конфігу користувача) і не йде через зовнішні diff-драйвери; читання й так
+# зупиняється на limit (див. _run_cmd_head)
+_GIT_DIFF_CMD = [*_GIT, "diff", "--no-color", "--no-ext-diff"]
+_GIT_DIFF_STAT_CMD = [*_GIT, "diff", "--stat", "--no-color", "--no-ext-diff"]
 
-    cmd = [
-        "grep",
+
+def git_diff_stat() -> dict:
+    """Лише `git diff --stat`: один процес і вивід O(кількості файлів), а не O(diff)."""
+    snap, data = _git_cache_get(("diff_stat",))
+    if data is not None:
+        return data
+    return _git_cache_put(("diff_stat",), snap, _diff_stat_result(*_run_cmd_head(_GIT_DIFF_STAT_CMD, _OUT_LIMIT, timeout_s=20)))
+
+
+async def git_diff_stat_async() -> dict:
+    snap, data = _git_cache_get(("diff_stat",))
+    if data is not None:
+        return data
+    return _git_cache_put(
+        ("diff_stat",), snap, _diff_stat_result(*await _run_cmd_head_async(_GIT_DIFF_STAT_CMD, _OUT_LIMIT, 20))
+    )
+
+
+def git_diff(limit: int = 8000, cached: bool = True) -> dict:
+    if not cached:
+        return _git_diff(limit)
+    snap, data = _git_cache_get(("diff", limit))
+    if data is not None:
+        return data
+    return _git_cache_put(("diff", limit), snap, _git_diff(limit))
+
+
+def _git_diff(limit: int) -> dict:
+    code, out, err, truncated = _run_cmd_head(_GIT_DIFF_CMD, limit, timeout_s=20)
+    if not truncated:
+        return _diff_result(code, out, err, limit)
+
+    return _diff_stat_result(*_run_cmd_head(_GIT_DIFF_STAT_CMD, _OUT_LIMIT, timeout_s=20))
+
+
+async def git_diff_async(limit: int = 8000, timeout_s: int = 20) -> dict:
+    snap, data = _git_cache_get(("diff", limit))
+    if data is not None:
+        return data
+    return _git_cache_put(("diff", limit), snap, await _git_diff_async(limit, timeout_s))
+
+
+async def _git_diff_async(limit: int, timeout_s: int) -> dict:
+    """Асинхронний git_diff для event loop-а (ендпоінти сервера).
+
+    Як і синхронний _git_diff: `git diff --stat` запускається лише тоді, коли
+    сам diff не вмістився в limit (зазвичай вистачає одного процесу).
+    """
+    code, out, err, truncated = await _run_cmd_head_async(_GIT_DIFF_CMD, limit, timeout_s)
+    if not truncated:
+        return _diff_result(code, out, err, limit)
+
+    return _diff_stat_result(*await _run_cmd_head_async(_GIT_DIFF_STAT_CMD, _OUT_LIMIT, timeout_s))
+
+
+def _search_cmd(q: str, max_matches: int) -> tuple[str, list[str]]:
+    """Команда пошуку: ripgrep, якщо він є (паралельний обхід, SIMD-пошук),
+    інакше git grep у git-репозиторії, інакше grep -R.
+
+    Запит — BRE, як у grep: rg отримує лише запити, що в його синтаксисі
+    означають те саме (див. _rg_compatible). Усі повертають `path:line:text`,
+    код 1 = нічого не знайдено.
+    """
+    if _RG and _rg_compatible(q):
+        return "rg", [
+            _RG,
+            "--no-heading",
+            "--line-number",
+            "--color=never",
+            "--hidden",
+            "--glob=!.git",
+            "--glob=!.venv",
+            "--max-count",
+            str(max_matches),
+            "--",
+            q,
+            ".",
+        ]
+    if os.path.isdir(".git"):
+        # git grep іде по індексу (tracked + untracked без ignored, тобто без
+        # .venv/node_modules) і паралелиться по ядрах; формат `path:line:text`
+        return "git grep", [
+            *_GIT,
+            "grep",
+            "--untracked",
+            "--threads=0",
+            "--no-color",
+            "-I",
+            "--line-number",
+            "--max-count",
+            str(max_matches),
+            "-e",
+            q,
+        ]
+    return "grep", _grep_cmd(q, max_matches)
+
+
+def _grep_cmd(q: str, max_matches: int) -> list[str]:
+    return [
+        _GREP,
         "-R",
         "--line-number",
         "--binary-files=without-match",
@@ -83,16 +515,279 @@ def repo_search(query: str, max_matches: int = 50) -> dict:
         q,
         ".",
     ]
-    code, out, err = _run_cmd(cmd, timeout_s=20)
+
+
+def _search_query(query: str) -> str:
+    q = (query or "").strip()
+    if len(q) < 2:
+        raise ValueError("query too short")
+    return q
+
+
+def _search_result(tool: str, code: int, out: str, err: str) -> dict:
     if code == 1:
         return {
             "found": False,
             "matches": "",
         }
     if code != 0:
-        raise RuntimeError(_cmd_error("grep", code, out, err))
+        raise RuntimeError(_cmd_error(tool, code, out, err))
     return {
         "found": True,
-        "matches": _truncate(out.strip()),
-        "stderr": _truncate(err.strip()),
+        # rg/grep -R по "." дають `./path`, git grep — `path`: зводимо до одного
+        "matches": _truncate(_LEADING_DOT_RE.sub("", out)),
+        "stderr": _truncate(err),
     }
+
+
+_LEADING_DOT_RE = re.compile(r"^\./", re.MULTILINE)
+_SCAN_EXCLUDE_DIRS = {".git", ".venv"}
+# Метасимволи BRE (grep -R, git grep без -E); без них запит — звичайний рядок.
+# ()+?{}| у BRE — звичайні символи, тож `print(` чи `a+b` шукаються буквально
+_REGEX_CHARS = frozenset(".[]*^$\\")
+# Символи, що в regex ripgrep (Rust) означають не те, що в BRE: з ними (або з
+# `*` на початку, літералом у BRE) запит іде в git grep/grep, а не в rg
+_RG_UNSAFE_CHARS = frozenset("\\()+?{}|")
+
+
+def _rg_compatible(q: str) -> bool:
+    return _RG_UNSAFE_CHARS.isdisjoint(q) and not q.lstrip("^").startswith("*")
+
+
+def _is_literal(q: str) -> bool:
+    return _REGEX_CHARS.isdisjoint(q)
+
+
+def _git_scan_tree(top: str) -> Optional[tuple[list[tuple[str, int]], list[str]]]:
+    """Файли під top за `git ls-files -co --exclude-standard` (як git grep --untracked).
+
+    Враховує .gitignore/.git/info/exclude, тож ігноровані файли (requests.jsonl,
+    .venv, node_modules) у пошук не потрапляють. Для перевірки свіжості індексу
+    повертає mtime батьківських каталогів, .gitignore-файлів і .git/index.
+    None — не git-репозиторій або git недоступний.
+    """
+    if not os.path.isdir(os.path.join(top, ".git")):
+        return None
+    stamps = [os.path.join(top, ".git", "index"), os.path.join(top, ".git", "info", "exclude")]
+    try:
+        before = {path: os.stat(path).st_mtime_ns for path in stamps if os.path.exists(path)}
+        proc = subprocess.run(
+            [*_GIT, "-C", top, "ls-files", "-co", "--exclude-standard", "-z"],
+            capture_output=True,
+            timeout=20,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if proc.returncode != 0:
+        return None
+
+    files: list[str] = []
+    parents = {top}
+    for raw in proc.stdout.split(b"\0"):
+        if not raw:
+            continue
+        rel = os.fsdecode(raw)
+        path = rel if top == "." else os.path.join(top, rel)
+        files.append(path)
+        parent = os.path.dirname(path) or top
+        while parent not in parents:
+            parents.add(parent)
+            parent = os.path.dirname(parent) or top
+        if os.path.basename(rel) == ".gitignore":
+            parents.add(path)
+
+    dirs: list[tuple[str, int]] = list(before.items())
+    for path in parents:
+        try:
+            dirs.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            continue
+    return dirs, files
+
+
+def _scan_tree(top: str) -> tuple[list[tuple[str, int]], list[str]]:
+    """Обхід дерева під top без _SCAN_EXCLUDE_DIRS: ([(каталог, st_mtime_ns)], [файли]).
+
+    Прямий os.scandir зі стеком замість os.walk: тип entry береться з d_type
+    без окремого stat, і не будуються проміжні списки dirs/files на кожен каталог.
+    Порядок як у os.walk (top-down): спершу файли каталогу, потім підкаталоги.
+    mtime каталогу знімається до його читання — зміна під час обходу не загубиться.
+    """
+    dirs: list[tuple[str, int]] = []
+    files: list[str] = []
+    stack = [top]
+    while stack:
+        path = stack.pop()
+        subdirs: list[str] = []
+        try:
+            dirs.append((path, os.stat(path).st_mtime_ns))
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in _SCAN_EXCLUDE_DIRS:
+                                subdirs.append(entry.path)
+                        elif entry.is_file():
+                            files.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        stack.extend(reversed(subdirs))
+    return dirs, files
+
+
+# Індекс файлів для _literal_hits (як `rg --files`, але в пам'яті): список
+# файлів лишається валідним, поки не змінився mtime жодного каталогу (файл
+# додано/видалено/перейменовано), .gitignore чи .git/index. Перевірка — один stat на каталог замість
+# читання всіх записів; вміст файлів усе одно читається щоразу заново.
+_FILE_INDEX: dict[str, tuple[list[tuple[str, int]], list[str]]] = {}
+_FILE_INDEX_LOCK = threading.Lock()
+
+
+def _index_fresh(dirs: list[tuple[str, int]]) -> bool:
+    try:
+        return all(os.stat(path).st_mtime_ns == mtime for path, mtime in dirs)
+    except OSError:
+        return False
+
+
+def _scan_files(top: str) -> list[str]:
+    """Шляхи файлів під top (git ls-files або _scan_tree), з індексу, якщо він свіжий."""
+    key = os.path.abspath(top)
+    with _FILE_INDEX_LOCK:
+        cached = _FILE_INDEX.get(key)
+    if cached is not None and _index_fresh(cached[0]):
+        return cached[1]
+    tree = _git_scan_tree(top)
+    dirs, files = tree if tree is not None else _scan_tree(top)
+    with _FILE_INDEX_LOCK:
+        _FILE_INDEX[key] = (dirs, files)
+    return files
+
+
+def _literal_hits(q: str, max_matches: int) -> tuple[list[tuple[str, int, str]], bool]:
+    """Рядки з q: [(path, line_no, text)] і чи повний результат.
+
+    Неповний — якщо хоч в одному файлі спрацював ліміт max_matches.
+    """
+    needle = q.encode("utf-8")
+    hits: list[tuple[str, int, str]] = []
+    complete = True
+
+    for path in _scan_files("."):
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if mm.find(b"\x00", 0, 4096) != -1:
+                        continue
+                    idx = mm.find(needle)
+                    line_no, pos, found = 1, 0, 0
+                    while idx != -1 and found < max_matches:
+                        # Номер рядка рахуємо інкрементально від попереднього збігу
+                        line_no += mm[pos:idx].count(b"\n")
+                        start = mm.rfind(b"\n", 0, idx) + 1
+                        end = mm.find(b"\n", idx)
+                        if end == -1:
+                            end = len(mm)
+                        text = mm[start:end].decode("utf-8", errors="replace")
+                        hits.append((path, line_no, text))
+                        found += 1
+                        pos = end
+                        idx = mm.find(needle, end)
+                    if idx != -1:
+                        complete = False
+        except (OSError, ValueError):
+            continue
+
+    return hits, complete
+
+
+# Результати сканів літералів для поступового набору запиту: якщо новий запит
+# містить уже знайдений (і той результат повний), збіги — підмножина старих
+# рядків, тож їх можна відфільтрувати без повторного обходу дерева.
+_SCAN_CACHE_MAX = 128
+_SCAN_CACHE: "OrderedDict[tuple[str, int], tuple[float, tuple, list[tuple[str, int, str]], bool]]" = OrderedDict()
+_SCAN_LOCK = threading.Lock()
+
+
+def _cached_hits(q: str, max_matches: int) -> tuple[list[tuple[str, int, str]], bool]:
+    snap = _repo_snapshot()
+    if snap is None or GIT_CACHE_TTL_S <= 0:
+        return _literal_hits(q, max_matches)
+
+    now = time.monotonic()
+    base = None
+    with _SCAN_LOCK:
+        for key, (expires, entry_snap, hits, complete) in reversed(_SCAN_CACHE.items()):
+            if expires <= now or entry_snap != snap or key[1] != max_matches:
+                continue
+            if key[0] == q:
+                _SCAN_CACHE.move_to_end(key)
+                return hits, complete
+            if complete and key[0] in q and (base is None or len(key[0]) > len(base[0])):
+                base = (key[0], hits)
+
+    if base is not None:
+        hits, complete = [h for h in base[1] if q in h[2]], True
+    else:
+        hits, complete = _literal_hits(q, max_matches)
+
+    with _SCAN_LOCK:
+        _SCAN_CACHE[(q, max_matches)] = (now + GIT_CACHE_TTL_S, snap, hits, complete)
+        _SCAN_CACHE.move_to_end((q, max_matches))
+        while len(_SCAN_CACHE) > _SCAN_CACHE_MAX:
+            _SCAN_CACHE.popitem(last=False)
+    return hits, complete
+
+
+def _literal_scan(q: str, max_matches: int, cached: bool = True) -> tuple[int, str, str]:
+    """Пошук рядка-літерала без запуску процесу: os.scandir + mmap.find.
+
+    Формат і семантика як у `git grep -m N`: `path:line:text`, не більше
+    N рядків на файл, бінарні файли (NUL у перших 4 КБ) пропускаються.
+    Повертає (code, out, err) як _run_cmd: код 1 = нічого не знайдено.
+    """
+    hits, _ = _cached_hits(q, max_matches) if cached else _literal_hits(q, max_matches)
+    out = "\n".join(
+        f"{path[2:] if path.startswith('./') else path}:{line_no}:{text}"
+        for path, line_no, text in hits
+    )
+    return (0 if hits else 1), out, ""
+
+
+def repo_search(query: str, max_matches: int = 50, cached: bool = True) -> dict:
+    q = _search_query(query)
+    snap, data = _git_cache_get(("search", q, max_matches)) if cached else (None, None)
+    if data is not None:
+        return data
+    if _is_literal(q):
+        data = _search_result("scan", *_literal_scan(q, max_matches, cached))
+    else:
+        tool, cmd = _search_cmd(q, max_matches)
+        result = _run_cmd(cmd, timeout_s=20)
+        if tool == "git grep" and result[0] > 1:
+            # старий git (без --max-count) або дивний репо — звичайний grep
+            tool, cmd = "grep", _grep_cmd(q, max_matches)
+            result = _run_cmd(cmd, timeout_s=20)
+        data = _search_result(tool, *result)
+    return _git_cache_put(("search", q, max_matches), snap, data)
+
+
+async def repo_search_async(query: str, max_matches: int = 50) -> dict:
+    q = _search_query(query)
+    snap, data = _git_cache_get(("search", q, max_matches))
+    if data is not None:
+        return data
+    if _is_literal(q):
+        data = _search_result("scan", *await asyncio.to_thread(_literal_scan, q, max_matches))
+    else:
+        tool, cmd = _search_cmd(q, max_matches)
+        result = await _run_cmd_async(cmd, timeout_s=20)
+        if tool == "git grep" and result[0] > 1:
+            tool, cmd = "grep", _grep_cmd(q, max_matches)
+            result = await _run_cmd_async(cmd, timeout_s=20)
+        data = _search_result(tool, *result)
+    return _git_cache_put(("search", q, max_matches), snap, data)
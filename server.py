@@ -4,14 +4,49 @@ Minimal HTTP API wrapper around multi-agent-lab.
 Запускається так (з кореня репозиторію):
     uvicorn server:app --reload
 
-Цей сервер просто викликає `app.py` як CLI,
-щоб не лізти у внутрішню реалізацію Supervisor / HeadAgent.
+Без reload (швидше; uvloop/httptools з uvicorn[standard]):
+    UVICORN_RELOAD=0 python server.py
+
+Для HTTP/2 (мультиплексування запитів UI на одному з'єднанні) — через
+reverse proxy (Caddy/nginx) або hypercorn:
+    hypercorn server:app --bind 127.0.0.1:8000 --keep-alive 30
+
+/chat обробляється в цьому ж процесі через HeadAgent (а він — через
+Supervisor), без запуску `app.py` як окремого CLI.
 """
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel
-from typing import Optional, Any
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, ConfigDict
+from typing import AsyncIterator, Optional, Any
 import repo_tools as rt
+
+try:
+    import orjson
+except ImportError:  # orjson опційний, stdlib json як фолбек
+    orjson = None  # type: ignore
+
+try:
+    import brotli
+except ImportError:  # brotli опційний: без нього віддаємо gzip
+    brotli = None  # type: ignore
+
 try:
     import tools_allowlist as ta
 except Exception:
@@ -21,25 +56,49 @@ from agents.head import HeadAgent
 from agents.writer import call_writer_llm
 from db import (
     get_projects,
+    get_book_for_project,
     get_book_outline,
     get_writing_projects,
     get_current_project,
     set_current_project,
     bootstrap_db,
     get_llm_config,
-    set_project_setting,
+    set_project_settings,
     ensure_writing_project_for_project_id,
     get_recent_errors,
+    get_book_version,
+    data_version,
 )
 
 
 
-app = FastAPI(title="multi-agent-lab API")
+# HTML/CSS/JS для вбудованого UI
+STATIC_DIR = Path(__file__).parent / "static"
+
+class _FastJSONResponse(JSONResponse):
+    """JSONResponse, що серіалізує через orjson (якщо він є)."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+app = FastAPI(title="multi-agent-lab API", default_response_class=_FastJSONResponse)
+# JSON-відповіді (outline, список проєктів, diff) добре стискаються
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 
 @app.on_event("startup")
 async def _startup() -> None:
-    bootstrap_db()
+    # Пул потоків для to_thread (DB, git, агенти): більше за дефолт (cpu+4),
+    # бо потоки здебільшого чекають на SQLite/LLM, а не рахують
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)))
+    await asyncio.to_thread(bootstrap_db)
+    # Прогрів першого /chat (пам'ять, urllib, нотатки) — у фоні, старт його не чекає
+    loop.run_in_executor(None, _warmup_chat)
 
 
 def _load_memory() -> Any:
@@ -74,17 +133,153 @@ def _load_memory() -> Any:
     return SimpleMemory()
 
 
-# Глобальні екземпляри для API (щоб пам'ять жила між запитами)
-MEMORY = _load_memory()
+# Глобальні екземпляри для API (щоб пам'ять жила між запитами).
+# Пам'ять вантажимо ліниво, при першому /chat: імпорт модуля (кожен воркер,
+# кожен reload) не читає диск, поки пам'ять реально не потрібна.
+_MEMORY: Any = None
+_MEMORY_LOCK = threading.Lock()
 HEAD = HeadAgent()
 
 
+def get_memory() -> Any:
+    global _MEMORY
+    if _MEMORY is None:
+        # lock — щоб одночасні перші /chat не завантажили пам'ять двічі
+        with _MEMORY_LOCK:
+            if _MEMORY is None:
+                _MEMORY = _load_memory()
+    return _MEMORY
+
+
+def _head_handle(task: str) -> str:
+    return HEAD.handle(task, get_memory())
+
+
+def _warmup_chat() -> None:
+    try:
+        get_memory()
+        HEAD.warmup()
+    except Exception:
+        pass
+
+
+# Верхня межа очікування відповіді /chat (HeadAgent/Writer можуть довго чекати LLM)
+CHAT_TIMEOUT_S = float(os.getenv("CHAT_TIMEOUT_S", "300"))
+# Скільки /chat виконується одночасно (за замовчуванням — по одному на ядро);
+# /health та UI обслуговуються поза цим лімітом
+MAX_PARALLEL_CHAT = max(1, int(os.getenv("MAX_PARALLEL_CHAT", "0")) or os.cpu_count() or 2)
+CHAT_SEM = asyncio.Semaphore(MAX_PARALLEL_CHAT)
+# Скільки /chat може бути прийнято (виконуються + чекають семафор); решта — 429,
+# щоб сплеск запитів не накопичував нескінченну чергу потоків і таймаутів
+CHAT_QUEUE_MAX = max(MAX_PARALLEL_CHAT, int(os.getenv("CHAT_QUEUE_MAX", "8")))
+_CHAT_STATS = {"pending": 0, "running": 0, "rejected": 0}
+
+
+# TTL-кеш для read-heavy ендпоінтів (/projects, /writing/outline, поточний
+# проєкт і його LLM-конфіг): UI опитує їх часто, а змінюються вони рідко.
+# Запис у БД з цього процесу інвалідовує кеш одразу (db.data_version),
+# записи з інших процесів (chat.py) — через TTL або POST /dev/cache/invalidate,
+# тому TTL короткий: кілька секунд достатньо, щоб зрізати опитування UI.
+READ_CACHE_TTL_S = float(os.getenv("READ_CACHE_TTL_S", "3"))
+_READ_CACHE_MAX = 256
+_READ_CACHE: dict[Any, tuple[float, int, Any]] = {}
+_READ_LOCKS: dict[Any, asyncio.Lock] = {}
+
+
+def _read_cache_get(key: Any) -> Any:
+    hit = _READ_CACHE.get(key)
+    if hit is not None and hit[0] > time.monotonic() and hit[1] == data_version():
+        return hit[2]
+    return None
+
+
+async def _cached_read(key: Any, fn: Any, *args: Any) -> Any:
+    """Повертає fn(*args) з кешу; на промаху рахує в потоці, один раз на ключ."""
+    value = _read_cache_get(key)
+    if value is not None:
+        return value
+    lock = _READ_LOCKS.setdefault(key, asyncio.Lock())
+    async with lock:
+        # поки чекали lock, значення міг порахувати інший запит
+        value = _read_cache_get(key)
+        if value is not None:
+            return value
+        version = data_version()
+        value = await asyncio.to_thread(fn, *args)
+        if len(_READ_CACHE) >= _READ_CACHE_MAX:
+            _READ_CACHE.clear()
+            # ключі задає клієнт (project_id тощо): разом з кешем прибираємо й
+            # вільні lock-и, інакше словник ріс би з кожним новим ключем
+            for stale in [k for k, lk in _READ_LOCKS.items() if not lk.locked()]:
+                del _READ_LOCKS[stale]
+        _READ_CACHE[key] = (time.monotonic() + READ_CACHE_TTL_S, version, value)
+        return value
+
+
+# Відповідь агента в JSON/DOM обмежуємо; повна версія доступна окремо
+CHAT_REPLY_MAX = int(os.getenv("CHAT_REPLY_MAX", str(64 * 1024)))
+_FULL_REPLIES_MAX = 32
+_FULL_REPLIES: "OrderedDict[str, str]" = OrderedDict()
+
+
+def _cap_reply(reply: str) -> tuple[str, Optional[str]]:
+    """Обрізає задовгу відповідь; повну кладе в невеликий LRU і повертає її id."""
+    reply = reply or ""
+    if len(reply) <= CHAT_REPLY_MAX:
+        return reply, None
+    full_id = uuid.uuid4().hex
+    _FULL_REPLIES[full_id] = reply
+    while len(_FULL_REPLIES) > _FULL_REPLIES_MAX:
+        _FULL_REPLIES.popitem(last=False)
+    cut = len(reply) - CHAT_REPLY_MAX
+    return reply[:CHAT_REPLY_MAX] + f"\n...[truncated {cut} chars]", full_id
+
+
+def _admit_chat() -> None:
+    """Бере місце в черзі /chat або відмовляє 429, якщо черга повна."""
+    if _CHAT_STATS["pending"] >= CHAT_QUEUE_MAX:
+        _CHAT_STATS["rejected"] += 1
+        raise HTTPException(
+            status_code=429,
+            detail="Chat is busy, retry later",
+            headers={"Retry-After": "5"},
+        )
+    _CHAT_STATS["pending"] += 1
+
+
+def _release_chat() -> None:
+    _CHAT_STATS["pending"] -= 1
+
+
+async def _run_chat_job(fn: Any, *args: Any) -> Any:
+    """Виконує синхронний виклик агента в потоці з лімітом паралельності і таймаутом.
+
+    Потік не можна перервати: після таймауту (чи відключення клієнта) він
+    доробляє своє, тож місце в CHAT_SEM звільняється лише тоді, коли потік
+    справді завершився — інакше ліміт паралельності не тримався б.
+    """
+    await CHAT_SEM.acquire()
+    _CHAT_STATS["running"] += 1
+    job = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+
+    def _finished(fut: "asyncio.Future[Any]") -> None:
+        _CHAT_STATS["running"] -= 1
+        CHAT_SEM.release()
+        if not fut.cancelled():
+            fut.exception()  # результат нікому не потрібен після таймауту — без "never retrieved"
+
+    job.add_done_callback(_finished)
+    return await asyncio.wait_for(asyncio.shield(job), timeout=CHAT_TIMEOUT_S)
+
+
 class ChatRequest(BaseModel):
     """Запит для /chat.
 
     Підтримуємо сумісність: можна надіслати `task` або `text`.
     """
 
+    model_config = ConfigDict(frozen=True, extra="forbid", str_strip_whitespace=True)
+
     task: Optional[str] = None
     text: Optional[str] = None
     auto: bool = True
@@ -94,998 +289,205 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     """Відповідь HeadAgent-а."""
 
+    model_config = ConfigDict(frozen=True)
+
     task: str
     auto: bool
     reply: str
+    # Якщо reply обрізано — id повної відповіді для GET /chat/{full_id}/full
+    full_id: Optional[str] = None
 
 
 # --- LLMConfigUpdate model ---
 
 class LLMConfigUpdate(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore", str_strip_whitespace=True)
+
     base_url: Optional[str] = None
     head_model: Optional[str] = None
     writer_model: Optional[str] = None
 
 
 class CurrentProjectUpdate(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore", str_strip_whitespace=True)
+
     project: str
 
 
 class SearchRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore", str_strip_whitespace=True)
+
     query: str
 
 
 class ToolRunRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore", str_strip_whitespace=True)
+
     name: str
     args: Optional[dict] = None
 
 
+def _etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match може містити кілька ETag-ів через кому, W/-префікс або `*`."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# CSS/JS UI віддаються під іменами з хешем вмісту (chat.<hash>.js) з вічним
+# кешем: після зміни файлу змінюється й URL у сторінці, тож старий кеш не заважає.
+_ASSET_HEADERS = {
+    "Cache-Control": "public, max-age=31536000, immutable",
+    "Vary": "Accept-Encoding",
+}
+_ASSETS: dict[str, tuple[bytes, bytes, str]] = {}
+
+
+def _hashed_asset(name: str, media_type: str) -> str:
+    """Реєструє static/<name> як /assets/<stem>.<hash>.<ext> і повертає цей URL."""
+    body = (STATIC_DIR / name).read_bytes()
+    stem, ext = name.rsplit(".", 1)
+    hashed = f"{stem}.{hashlib.blake2b(body, digest_size=4).hexdigest()}.{ext}"
+    _ASSETS[hashed] = (body, gzip.compress(body, compresslevel=9, mtime=0), media_type)
+    return f"/assets/{hashed}"
+
+
+# Шаблон сторінки статичний, тому читаємо його один раз при імпорті.
+_ROOT_JS_URL = _hashed_asset("chat.js", "text/javascript; charset=utf-8")
+_ROOT_HTML_BYTES = (
+    (STATIC_DIR / "index.html").read_text(encoding="utf-8")
+    .replace("/static/chat.css", _hashed_asset("chat.css", "text/css; charset=utf-8"))
+    .replace("/static/chat.js", _ROOT_JS_URL)
+    .encode("utf-8")
+)
+# Куди вставляти дані /bootstrap: перед chat.js, щоб скрипт їх уже бачив
+_ROOT_DATA_AT = _ROOT_HTML_BYTES.index(b'<script src="' + _ROOT_JS_URL.encode("ascii"))
+
+
+@lru_cache(maxsize=8)
+def _root_page(data: bytes) -> tuple[str, bytes, tuple[tuple[str, bytes], ...]]:
+    """Сторінка з вбудованими даними /bootstrap: (ETag, HTML, стиснені варіанти).
+
+    Дані змінюються рідко, тож HTML, ETag і gzip/br для кожної їх версії
+    рахуються один раз — GZipMiddleware цю відповідь уже не чіпає.
+    """
+    html = _ROOT_HTML_BYTES
+    if data:
+        # <, > і & у JSON — як \u-escape: ні "</script>", ні "<!--<script" з назв
+        # проєктів/книг не змінять стан HTML-токенізатора всередині <script>
+        script = (
+            b'<script id="bootstrap-data" type="application/json">'
+            + data.replace(b"&", b"\\u0026").replace(b"<", b"\\u003c").replace(b">", b"\\u003e")
+            + b"</script>\n    "
+        )
+        html = html[:_ROOT_DATA_AT] + script + html[_ROOT_DATA_AT:]
+    encoded = [("gzip", gzip.compress(html, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoded.insert(0, ("br", brotli.compress(html, quality=11)))
+    return _etag_for(html), html, tuple(encoded)
+
+
+_ROOT_HEADERS = {
+    # no-cache = браузер завжди перевіряє актуальність, але отримує 304 без тіла
+    "Cache-Control": "no-cache",
+    "Vary": "Accept-Encoding",
+}
+
+
 @app.get("/", response_class=HTMLResponse)
-async def root() -> HTMLResponse:
+async def root(request: Request) -> Response:
     """
     Проста HTML-сторінка з мінімальним чат-інтерфейсом до /chat.
 
     Це тимчасовий "shell UI", щоб можна було клікати,
-    не лізучи щоразу в /docs або curl.
-    """
-    html = """
-    <!doctype html>
-    <html lang="uk">
-    <head>
-        <meta charset="utf-8" />
-        <meta http-equiv="Cache-Control" content="no-store" />
-        <meta http-equiv="Pragma" content="no-cache" />
-        <meta http-equiv="Expires" content="0" />
-        <title>multi-agent-lab — Chat</title>
-        <style>
-            body {
-                margin: 0;
-                padding: 0;
-                font-family: system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
-                display: flex;
-                height: 100vh;
-            }
-            .sidebar {
-                width: 220px;
-                background: #111827;
-                color: #e5e7eb;
-                padding: 16px;
-                box-sizing: border-box;
-            }
-            .sidebar h1 {
-                font-size: 16px;
-                margin: 0 0 12px;
-            }
-            .sidebar small {
-                display: block;
-                color: #9ca3af;
-                margin-top: 4px;
-            }
-            .projects-list {
-                margin-top: 8px;
-                display: flex;
-                flex-direction: column;
-                gap: 4px;
-            }
-            .project-item {
-                border-radius: 6px;
-                padding: 6px 8px;
-                background: #020617;
-                border: 1px solid #1f2933;
-                cursor: default;
-            }
-            .project-item.active {
-                border-color: #22c55e;
-                box-shadow: 0 0 0 1px rgba(34, 197, 94, 0.3);
-            }
-            .project-name {
-                font-size: 13px;
-                color: #e5e7eb;
-            }
-            .project-meta {
-                font-size: 11px;
-                color: #9ca3af;
-            }
-            .main {
-                flex: 1;
-                display: flex;
-                flex-direction: column;
-                background: #020617;
-                color: #e5e7eb;
-            }
-            .header {
-                padding: 12px 16px;
-                border-bottom: 1px solid #1f2933;
-                font-size: 14px;
-                color: #9ca3af;
-                display: flex;
-                align-items: center;
-                justify-content: space-between;
-                gap: 8px;
-            }
-            .header-actions {
-                display: flex;
-                align-items: center;
-                gap: 8px;
-            }
-            .header-text {
-                flex: 1;
-            }
-            .structure-panel {
-                border-bottom: 1px solid #1f2933;
-                background: #020617;
-                padding: 8px 16px 12px;
-                max-height: 260px;
-                overflow-y: auto;
-                box-sizing: border-box;
-                font-size: 13px;
-            }
-            .structure-panel.hidden {
-                display: none;
-            }
-            .structure-header {
-                font-size: 13px;
-                color: #9ca3af;
-                margin-bottom: 4px;
-                text-transform: uppercase;
-                letter-spacing: 0.06em;
-            }
-            .structure-header-row {
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                margin-bottom: 4px;
-            }
-            .btn-ghost {
-                border-radius: 6px;
-                border: 1px solid #374151;
-                padding: 2px 8px;
-                font-size: 11px;
-                cursor: pointer;
-                background: transparent;
-                color: #9ca3af;
-            }
-            .btn-ghost:hover {
-                border-color: #4b5563;
-                color: #e5e7eb;
-            }
-            .structure-body {
-                color: #e5e7eb;
-            }
-            .btn-secondary {
-                border-radius: 8px;
-                border: 1px solid #374151;
-                padding: 6px 10px;
-                font-size: 12px;
-                cursor: pointer;
-                background: #020617;
-                color: #e5e7eb;
-            }
-            .btn-secondary:hover {
-                border-color: #4b5563;
-            }
-            .dev-actions {
-                display: flex;
-                gap: 6px;
-            }
-            .dev-search-row {
-                display: flex;
-                gap: 6px;
-                margin-bottom: 8px;
-            }
-            .dev-patch-row {
-                display: flex;
-                gap: 6px;
-                margin-top: 8px;
-            }
-            #dev-search-q {
-                flex: 1;
-                border-radius: 6px;
-                border: 1px solid #1f2933;
-                background: #0f172a;
-                color: #e5e7eb;
-                padding: 6px 8px;
-                font-size: 12px;
-                box-sizing: border-box;
-            }
-            #dev-patch {
-                width: 100%;
-                height: 140px;
-                border-radius: 8px;
-                border: 1px solid #1f2933;
-                background: #0f172a;
-                color: #e5e7eb;
-                padding: 8px;
-                font-size: 12px;
-                font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", monospace;
-                box-sizing: border-box;
-                resize: vertical;
-            }
-            .dev-hint {
-                font-size: 11px;
-                color: #9ca3af;
-                margin-top: 6px;
-                margin-bottom: 6px;
-            }
-            #dev-output {
-                border-radius: 8px;
-                border: 1px solid #1f2933;
-                background: #0b1220;
-                color: #e5e7eb;
-                padding: 8px;
-                font-size: 12px;
-                white-space: pre-wrap;
-                font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", monospace;
-            }
-            .chat-log {
-                flex: 1;
-                padding: 16px;
-                overflow-y: auto;
-                box-sizing: border-box;
-            }
-            .msg {
-                margin-bottom: 12px;
-            }
-            .msg.me {
-                text-align: right;
-            }
-            .msg .who {
-                font-size: 11px;
-                text-transform: uppercase;
-                letter-spacing: 0.06em;
-                color: #9ca3af;
-            }
-            .msg .bubble {
-                display: inline-block;
-                border-radius: 12px;
-                padding: 8px 10px;
-                margin-top: 4px;
-                max-width: 80%;
-                text-align: left;
-                white-space: pre-wrap;
-                word-wrap: break-word;
-            }
-            .msg.me .bubble {
-                background: #1d4ed8;
-                color: white;
-            }
-            .msg.bot .bubble {
-                background: #020617;
-                border: 1px solid #1f2933;
-            }
-            .input-bar {
-                border-top: 1px solid #1f2933;
-                padding: 10px 12px;
-                display: flex;
-                flex-direction: column;
-                gap: 8px;
-                box-sizing: border-box;
-            }
-            .row {
-                display: flex;
-                gap: 8px;
-                align-items: center;
-            }
-            textarea {
-                flex: 1;
-                resize: none;
-                min-height: 60px;
-                max-height: 160px;
-                border-radius: 8px;
-                border: 1px solid #374151;
-                background: #020617;
-                color: #e5e7eb;
-                padding: 8px 10px;
-                font-family: inherit;
-                font-size: 14px;
-            }
-            button {
-                border-radius: 8px;
-                border: none;
-                padding: 8px 16px;
-                font-size: 14px;
-                cursor: pointer;
-                background: #22c55e;
-                color: #022c22;
-                font-weight: 500;
-            }
-            button:disabled {
-                opacity: 0.6;
-                cursor: default;
-            }
-            .meta-row {
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                font-size: 12px;
-                color: #9ca3af;
-            }
-            .mode-switch {
-                display: inline-flex;
-                align-items: center;
-                gap: 6px;
-            }
-            .mode-select {
-                background: #0f172a;
-                color: #e5e7eb;
-                border: 1px solid #374151;
-                border-radius: 6px;
-                padding: 2px 6px;
-                font-size: 12px;
-            }
-            .status {
-                font-size: 12px;
-            }
-            .status.error {
-                color: #f97373;
-            }
-            input[type="checkbox"] {
-                margin-right: 4px;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="sidebar">
-            <h1>multi-agent-lab</h1>
-            <div>
-                <strong>Проєкти:</strong>
-                <div id="projects-list" class="projects-list">
-                    <div class="project-item">
-                        <div class="project-name">Завантаження...</div>
-                    </div>
-                </div>
-                <small>Поки що цей UI працює з поточним проєктом.</small>
-            </div>
-        </div>
-        <div class="main">
-            <div class="header">
-                <div class="header-text">
-                    Простий чат з /chat (HeadAgent). Далі будемо розвивати до повного робочого середовища.
-                </div>
-                <div class="header-actions">
-                    <button id="toggle-structure" class="btn-secondary" type="button">Структура ▼</button>
-                    <button id="toggle-dev" class="btn-secondary" type="button">Dev ⚙︎</button>
-                </div>
-            </div>
-            <div id="dev-panel" class="structure-panel hidden">
-                <div class="structure-header-row">
-                    <div class="structure-header">Dev Panel</div>
-                    <div class="dev-actions">
-                        <button id="dev-refresh-status" class="btn-ghost" type="button">Status</button>
-                        <button id="dev-refresh-diff" class="btn-ghost" type="button">Diff</button>
-                        <button id="dev-refresh-errors" class="btn-ghost" type="button">Errors</button>
-                    </div>
-                </div>
-                <div class="dev-search-row">
-                    <input id="dev-search-q" placeholder="Search in repo..." />
-                    <button id="dev-search-btn" class="btn-ghost" type="button">Search</button>
-                </div>
-                <textarea id="dev-patch" placeholder="Paste unified diff patch here..."></textarea>
-                <div class="dev-hint">Спочатку перевір Patch через Check, потім застосовуй Apply.</div>
-                <div class="dev-patch-row">
-                    <button id="dev-patch-check" class="btn-ghost" type="button">Check patch</button>
-                    <button id="dev-patch-apply" class="btn-secondary" type="button">Apply patch</button>
-                </div>
-                <pre id="dev-output"></pre>
-            </div>
-            <div id="structure-panel" class="structure-panel hidden">
-                <div class="structure-header-row">
-                    <div class="structure-header">Структура проєкту</div>
-                    <button id="refresh-outline" class="btn-ghost" type="button">Оновити</button>
-                </div>
-                <div class="structure-body">
-                    <p>Тут буде дерево: Книга → Глави → Сцени та ключові сюжетні розгалуження.</p>
-                    <p>Якщо структура не оновилась, натисни «Оновити».</p>
-                </div>
-            </div>
-            <div id="log" class="chat-log"></div>
-            <div class="input-bar">
-                <div class="row">
-                    <textarea id="task" placeholder="Напишіть запит, наприклад: Склади план розвитку multi-agent-lab."></textarea>
-                    <button id="send" type="button">Send</button>
-                </div>
-                <div class="meta-row">
-                    <label>
-                        <input type="checkbox" id="auto" checked />
-                        auto (--auto)
-                    </label>
-                    <label class="mode-switch">
-                        Mode:
-                        <select id="mode" class="mode-select">
-                            <option value="head" selected>Head</option>
-                            <option value="writer">Writer</option>
-                        </select>
-                    </label>
-                    <div id="status" class="status"></div>
-                </div>
-            </div>
-        </div>
-        <script>
-            const taskEl = document.getElementById('task');
-            const autoEl = document.getElementById('auto');
-            const modeEl = document.getElementById('mode');
-            const sendBtn = document.getElementById('send');
-            const logEl = document.getElementById('log');
-            const statusEl = document.getElementById('status');
-            const toggleStructureBtn = document.getElementById('toggle-structure');
-            const toggleDevBtn = document.getElementById('toggle-dev');
-            const structurePanel = document.getElementById('structure-panel');
-            const structureBody = document.querySelector('.structure-body');
-            const refreshOutlineBtn = document.getElementById('refresh-outline');
-            const projectsListEl = document.getElementById('projects-list');
-            const devPanel = document.getElementById('dev-panel');
-            const devOutput = document.getElementById('dev-output');
-            const devSearchInput = document.getElementById('dev-search-q');
-            const devSearchBtn = document.getElementById('dev-search-btn');
-            const devRefreshStatusBtn = document.getElementById('dev-refresh-status');
-            const devRefreshDiffBtn = document.getElementById('dev-refresh-diff');
-            const devRefreshErrorsBtn = document.getElementById('dev-refresh-errors');
-            const devPatchEl = document.getElementById('dev-patch');
-            const devPatchCheckBtn = document.getElementById('dev-patch-check');
-            const devPatchApplyBtn = document.getElementById('dev-patch-apply');
-            let structureVisible = false;
-            let outlineLoaded = false;
-            let devVisible = false;
-            // Поточний проєкт, обраний у сайдбарі
-            let currentProjectId = null;
-            let currentProjectType = null;
-            let currentProjectName = null;
-
-            if (statusEl) {
-                statusEl.textContent = 'UI JS loaded';
-                statusEl.classList.remove('error');
-            }
-
-            function reportUiError(message) {
-                if (!statusEl) return;
-                statusEl.textContent = 'UI error: ' + message;
-                statusEl.classList.add('error');
-            }
-
-            window.addEventListener('error', (e) => {
-                const msg = e && e.message ? e.message : 'unknown';
-                reportUiError(msg);
-            });
-            window.addEventListener('unhandledrejection', (e) => {
-                const msg = e && e.reason ? e.reason : 'unhandled rejection';
-                reportUiError(msg);
-            });
-
-            async function loadCurrentProjectName() {
-                try {
-                    const resp = await fetch('/projects/current');
-                    if (!resp.ok) {
-                        return null;
-                    }
-                    const data = await resp.json();
-                    const project = data.project;
-                    if (typeof project === 'string') {
-                        return project;
-                    }
-                    if (project && typeof project.name === 'string') {
-                        return project.name;
-                    }
-                    return null;
-                } catch (err) {
-                    console.error(err);
-                    reportUiError(err.message || err);
-                    return null;
-                }
-            }
-
-            async function loadProjects() {
-                if (!projectsListEl) return;
-
-                try {
-                    projectsListEl.innerHTML =
-                        '<div class="project-item"><div class="project-name">Завантаження...</div></div>';
-                    currentProjectName = await loadCurrentProjectName();
-                    const resp = await fetch('/projects');
-                    if (!resp.ok) {
-                        throw new Error('HTTP ' + resp.status);
-                    }
-                    const data = await resp.json();
-                    renderProjects(data.projects || [], currentProjectName);
-                    if (statusEl) {
-                        statusEl.textContent = 'Projects loaded';
-                        statusEl.classList.remove('error');
-                    }
-                } catch (err) {
-                    console.error(err);
-                    reportUiError(err.message || err);
-                    projectsListEl.innerHTML =
-                        '<div class="project-item"><div class="project-name">Помилка завантаження проєктів</div></div>';
-                }
-            }
-
-            function renderProjects(projects, currentName) {
-                if (!projectsListEl) return;
-
-                if (!projects.length) {
-                    projectsListEl.innerHTML =
-                        '<div class="project-item"><div class="project-name">Немає проєктів</div></div>';
-                    currentProjectId = null;
-                    currentProjectType = null;
-                    return;
-                }
-
-                let html = '';
-                for (const p of projects) {
-                    const isActive = (p.name === currentName);
-                    // Якщо ще не обрано поточний проєкт — беремо активний з currentName
-                    if (isActive && currentProjectId === null) {
-                        currentProjectId = p.id;
-                        currentProjectType = p.type || null;
-                    }
-                    html += '<div class="project-item' + (isActive ? ' active' : '') + '" ' +
-                            'data-project-id="' + p.id + '" ' +
-                            'data-project-type="' + (p.type || '') + '">';
-                    html += '<div class="project-name">' + (p.name || 'Без назви') + '</div>';
-                    if (p.type) {
-                        html += '<div class="project-meta">' + p.type + '</div>';
-                    }
-                    html += '</div>';
-                }
-                projectsListEl.innerHTML = html;
-
-                // Навішуємо клік‑обробники для вибору поточного проєкту
-                const items = projectsListEl.querySelectorAll('.project-item');
-                items.forEach((el) => {
-                    el.addEventListener('click', async () => {
-                        const name = (el.querySelector('.project-name') || {}).textContent || '';
-                        try {
-                            const resp = await fetch('/projects/current', {
-                                method: 'POST',
-                                headers: {
-                                    'Content-Type': 'application/json'
-                                },
-                                body: JSON.stringify({
-                                    project: name
-                                })
-                            });
-                            if (!resp.ok) {
-                                throw new Error('HTTP ' + resp.status);
-                            }
-                            const data = await resp.json();
-                            const project = data.project;
-                            if (typeof project === 'string') {
-                                currentProjectName = project;
-                            } else if (project && typeof project.name === 'string') {
-                                currentProjectName = project.name;
-                            } else {
-                                currentProjectName = name;
-                            }
-
-                            const pid = el.getAttribute('data-project-id');
-                            const ptype = el.getAttribute('data-project-type') || null;
-                            currentProjectId = pid ? parseInt(pid, 10) : null;
-                            currentProjectType = ptype;
-
-                            items.forEach((i) => i.classList.remove('active'));
-                            el.classList.add('active');
-
-                            // Якщо відкрита панель структури — оновлюємо її для вибраного проєкту
-                            if (structureVisible) {
-                                loadOutlineForCurrentProject();
-                            }
-                        } catch (err) {
-                            console.error(err);
-                            reportUiError(err.message || err);
-                        }
-                    });
-                });
-            }
-
-            if (toggleStructureBtn && structurePanel) {
-                toggleStructureBtn.addEventListener('click', () => {
-                    structureVisible = !structureVisible;
-                    if (structureVisible) {
-                        structurePanel.classList.remove('hidden');
-                        toggleStructureBtn.textContent = 'Структура ▲';
-                        // Перший раз при відкритті — завантажуємо структуру
-                        if (!outlineLoaded) {
-                            loadOutlineForCurrentProject();
-                        }
-                    } else {
-                        structurePanel.classList.add('hidden');
-                        toggleStructureBtn.textContent = 'Структура ▼';
-                    }
-                });
-            }
-
-            if (refreshOutlineBtn && structurePanel) {
-                refreshOutlineBtn.addEventListener('click', () => {
-                    loadOutlineForCurrentProject();
-                });
-            }
-
-            function setDevOutput(text) {
-                if (!devOutput) return;
-                devOutput.textContent = text || '';
-            }
-
-            async function devRunTool(name, args) {
-                try {
-                    const resp = await fetch('/dev/tools/run', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json'
-                        },
-                        body: JSON.stringify({
-                            name: name,
-                            args: args || {}
-                        })
-                    });
-                    if (!resp.ok) {
-                        try {
-                            const data = await resp.json();
-                            const msg = (data && (data.error || data.detail)) || ('HTTP ' + resp.status);
-                            return { ok: false, error: msg };
-                        } catch (e) {
-                            try {
-                                const text = await resp.text();
-                                return { ok: false, error: text || ('HTTP ' + resp.status) };
-                            } catch (_) {
-                                return { ok: false, error: 'HTTP ' + resp.status };
-                            }
-                        }
-                    }
-                    const data = await resp.json();
-                    if (data && data.ok) {
-                        return { ok: true, data: data.data };
-                    }
-                    const msg = (data && (data.error || data.detail)) || 'unknown error';
-                    return { ok: false, error: msg };
-                } catch (err) {
-                    return { ok: false, error: err.message };
-                }
-            }
-
-            async function loadDevStatus() {
-                const r = await devRunTool('git_status', {});
-                if (r.ok) {
-                    setDevOutput(JSON.stringify(r.data, null, 2));
-                } else {
-                    setDevOutput('ERROR: ' + r.error);
-                }
-            }
-
-            async function loadDevDiff() {
-                const r = await devRunTool('git_diff', {});
-                if (r.ok) {
-                    if (r.data && r.data.truncated) {
-                        setDevOutput(r.data.stat || '');
-                    } else {
-                        setDevOutput((r.data && r.data.diff) || '');
-                    }
-                } else {
-                    setDevOutput('ERROR: ' + r.error);
-                }
-            }
-
-            async function loadDevErrors() {
-                const r = await devRunTool('recent_errors', { limit: 5 });
-                if (r.ok) {
-                    setDevOutput(JSON.stringify(r.data, null, 2));
-                } else {
-                    setDevOutput('ERROR: ' + r.error);
-                }
-            }
-
-            async function devSearch() {
-                if (!devSearchInput) return;
-                const query = devSearchInput.value.trim();
-                if (query.length < 2) {
-                    setDevOutput('Вкажи щонайменше 2 символи для пошуку.');
-                    return;
-                }
-                const r = await devRunTool('repo_search', { query: query, max_matches: 50 });
-                if (r.ok) {
-                    if (!r.data || !r.data.found) {
-                        setDevOutput('нічого не знайдено');
-                    } else {
-                        setDevOutput(r.data.matches || '');
-                    }
-                } else {
-                    setDevOutput('ERROR: ' + r.error);
-                }
-            }
-
-            async function devPatchCheck() {
-                if (!devPatchEl) return;
-                const patch = devPatchEl.value || '';
-                if (patch.trim().length < 10) {
-                    setDevOutput('Patch too short');
-                    return;
-                }
-                const r = await devRunTool('git_apply_check', { patch: patch });
-                if (!r.ok) {
-                    setDevOutput('ERROR: ' + r.error);
-                    return;
-                }
-                const rc = r.data && typeof r.data.returncode !== 'undefined' ? r.data.returncode : 'unknown';
-                const err = (r.data && r.data.stderr) || '';
-                if (rc === 0) {
-                    setDevOutput(err ? ('OK\\n' + err) : 'OK');
-                } else {
-                    setDevOutput('ERROR: returncode=' + rc + (err ? '\\n' + err : ''));
-                }
-            }
-
-            async function devPatchApply() {
-                if (!devPatchEl) return;
-                const patch = devPatchEl.value || '';
-                if (patch.trim().length < 10) {
-                    setDevOutput('Patch too short');
-                    return;
-                }
-                const check = await devRunTool('git_apply_check', { patch: patch });
-                if (!check.ok) {
-                    setDevOutput('ERROR: ' + check.error);
-                    return;
-                }
-                const checkRc = check.data && typeof check.data.returncode !== 'undefined' ? check.data.returncode : 'unknown';
-                if (checkRc !== 0) {
-                    const err = (check.data && check.data.stderr) || '';
-                    setDevOutput('ERROR: returncode=' + checkRc + (err ? '\\n' + err : ''));
-                    return;
-                }
-                const apply = await devRunTool('git_apply', { patch: patch });
-                if (!apply.ok) {
-                    setDevOutput('ERROR: ' + apply.error);
-                    return;
-                }
-                const rc = apply.data && typeof apply.data.returncode !== 'undefined' ? apply.data.returncode : 'unknown';
-                const err = (apply.data && apply.data.stderr) || '';
-                if (rc === 0) {
-                    setDevOutput(err ? ('Applied\\n' + err) : 'Applied');
-                } else {
-                    setDevOutput('ERROR: returncode=' + rc + (err ? '\\n' + err : ''));
-                }
-            }
-
-            if (toggleDevBtn && devPanel) {
-                toggleDevBtn.addEventListener('click', () => {
-                    devVisible = !devVisible;
-                    if (devVisible) {
-                        devPanel.classList.remove('hidden');
-                    } else {
-                        devPanel.classList.add('hidden');
-                    }
-                });
-            }
-
-            if (devRefreshStatusBtn) {
-                devRefreshStatusBtn.addEventListener('click', () => {
-                    loadDevStatus();
-                });
-            }
-            if (devRefreshDiffBtn) {
-                devRefreshDiffBtn.addEventListener('click', () => {
-                    loadDevDiff();
-                });
-            }
-            if (devRefreshErrorsBtn) {
-                devRefreshErrorsBtn.addEventListener('click', () => {
-                    loadDevErrors();
-                });
-            }
-            if (devSearchBtn) {
-                devSearchBtn.addEventListener('click', () => {
-                    devSearch();
-                });
-            }
-            if (devPatchCheckBtn) {
-                devPatchCheckBtn.addEventListener('click', () => {
-                    devPatchCheck();
-                });
-            }
-            if (devPatchApplyBtn) {
-                devPatchApplyBtn.addEventListener('click', () => {
-                    devPatchApply();
-                });
-            }
-
-            function loadOutlineForCurrentProject() {
-                if (!structureBody) return;
-
-                // Поки що для non-writing проєктів показуємо простий текст.
-                if (!currentProjectId) {
-                    structureBody.innerHTML = '<p>Поточний проєкт не вибрано.</p>';
-                    return;
-                }
-                if (currentProjectType !== 'writing') {
-                    structureBody.innerHTML =
-                        '<p>Для проєкту типу <code>' + (currentProjectType || 'unknown') +
-                        '</code> структура книги ще не налаштована.</p>';
-                    return;
-                }
-
-                // Тепер запитуємо outline за project_id, без жорсткого book_id.
-                loadOutlineForProject(currentProjectId);
-            }
-
-            async function loadOutlineForProject(projectId) {
-                if (!structureBody) return;
-                structureBody.innerHTML = '<p>Завантаження структури…</p>';
-
-                try {
-                    const resp = await fetch('/writing/outline?project_id=' + projectId);
-                    if (!resp.ok) {
-                        throw new Error('HTTP ' + resp.status);
-                    }
-                    const data = await resp.json();
-                    renderOutline(data);
-                    outlineLoaded = true;
-                } catch (err) {
-                    console.error(err);
-                    structureBody.innerHTML =
-                        '<p>Не вдалося завантажити структуру: ' + err.message + '</p>';
-                }
-            }
-
-            function renderOutline(data) {
-                if (!structureBody) return;
-
-                if (!data || !data.book) {
-                    structureBody.innerHTML = '<p>Структура відсутня.</p>';
-                    return;
-                }
-
-                const book = data.book;
-                const chapters = data.chapters || [];
-                let html = '';
-
-                html += '<div><strong>Книга:</strong> ' + book.title +
-                        ' <span style="color:#9ca3af;">[' + (book.status || 'unknown') + ']</span></div>';
-
-                if (book.project_name) {
-                    html += '<div style="font-size:12px;color:#9ca3af;">Проєкт: ' +
-                            book.project_name + '</div>';
-                }
-
-                if (book.synopsis) {
-                    html += '<p style="margin-top:4px;">' + book.synopsis + '</p>';
-                }
-
-                if (!chapters.length) {
-                    html += '<p>Глави ще не додані.</p>';
-                } else {
-                    html += '<ul style="margin:8px 0 0 0; padding-left:16px;">';
-                    for (const ch of chapters) {
-                        html += '<li>';
-                        html += '<div><strong>Глава ' + (ch.number || '') + ':</strong> ' +
-                                (ch.title || '') +
-                                ' <span style="color:#9ca3af;">[' + (ch.status || 'unknown') + ']</span></div>';
-
-                        if (ch.summary) {
-                            html += '<div style="font-size:12px;color:#9ca3af;margin-bottom:2px;">' +
-                                    ch.summary + '</div>';
-                        }
-
-                        const scenes = ch.scenes || [];
-                        if (scenes.length) {
-                            html += '<ul style="margin:4px 0 4px 16px;padding-left:12px;">';
-                            for (const sc of scenes) {
-                                html += '<li>';
-                                html += '<span>' + (sc.title || 'Сцена') +
-                                        ' <span style="color:#9ca3af;">[' +
-                                        (sc.status || 'unknown') + ']</span></span>';
-                                html += '</li>';
-                            }
-                            html += '</ul>';
-                        }
-
-                        html += '</li>';
-                    }
-                    html += '</ul>';
-                }
-
-                structureBody.innerHTML = html;
-            }
-
-            async function send() {
-                const task = taskEl.value.trim();
-                if (!task) return;
-                sendBtn.disabled = true;
-                statusEl.textContent = 'Виконується...';
-                statusEl.classList.remove('error');
-
-                const mode = (modeEl && modeEl.value) ? modeEl.value : 'head';
-                const agentLabel = mode === 'writer' ? 'WriterAgent' : 'HeadAgent';
-
-                appendMessage('You', task);
-                taskEl.value = '';
-
-                try {
-                    const resp = await fetch('/chat', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json'
-                        },
-                        body: JSON.stringify({
-                            task: task,
-                            auto: autoEl.checked,
-                            mode: mode
-                        })
-                    });
-                    if (!resp.ok) {
-                        throw new Error('HTTP ' + resp.status);
-                    }
-                    const data = await resp.json();
-                    const text = data.reply || '(порожня відповідь)';
-                    appendMessage(agentLabel, text);
-                    statusEl.textContent = 'Готово';
-                } catch (err) {
-                    console.error(err);
-                    statusEl.textContent = 'Помилка: ' + err.message;
-                    statusEl.classList.add('error');
-                    appendMessage(agentLabel, 'Помилка при виклику /chat: ' + err.message);
-                } finally {
-                    sendBtn.disabled = false;
-                    taskEl.focus();
-                }
-            }
-
-            function appendMessage(who, text) {
-                const div = document.createElement('div');
-                div.className = 'msg ' + (who === 'You' ? 'me' : 'bot');
-                const whoEl = document.createElement('div');
-                whoEl.className = 'who';
-                whoEl.textContent = who;
-                const bubble = document.createElement('div');
-                bubble.className = 'bubble';
-                bubble.textContent = text;
-                div.appendChild(whoEl);
-                div.appendChild(bubble);
-                logEl.appendChild(div);
-                logEl.scrollTop = logEl.scrollHeight;
-            }
-
-            // При завантаженні сторінки одразу підтягуємо список проєктів
-            loadProjects();
-            sendBtn.addEventListener('click', send);
-            taskEl.addEventListener('keydown', (e) => {
-                if (e.key === 'Enter' && (e.metaKey || e.ctrlKey)) {
-                    e.preventDefault();
-                    send();
-                }
-            });
-        </script>
-    </body>
-    </html>
+    не лізучи щоразу в /docs або curl. Проєкти й outline вбудовані в
+    сторінку, тож сайдбар малюється без окремого запиту до /bootstrap.
     """
-    return HTMLResponse(
+    try:
+        _, data = _encode_json(await _bootstrap_payload())
+    except Exception:
+        # без даних UI сам піде в /bootstrap
+        data = b""
+    etag, html, encoded = _root_page(data)
+    headers = {**_ROOT_HEADERS, "ETag": etag}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    accept = request.headers.get("accept-encoding", "")
+    for encoding, body in encoded:
+        if encoding in accept:
+            return Response(
+                content=body,
+                media_type="text/html; charset=utf-8",
+                headers={**headers, "Content-Encoding": encoding},
+            )
+    return Response(
         content=html,
-        headers={"Cache-Control": "no-store"},
+        media_type="text/html; charset=utf-8",
+        headers=headers,
     )
 
+@app.get("/assets/{name}")
+async def asset(name: str, request: Request) -> Response:
+    """CSS/JS з хешем в імені; невідомий (застарілий) хеш — 404."""
+    item = _ASSETS.get(name)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    body, body_gzip, media_type = item
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(
+            content=body_gzip,
+            media_type=media_type,
+            headers={**_ASSET_HEADERS, "Content-Encoding": "gzip"},
+        )
+    return Response(content=body, media_type=media_type, headers=_ASSET_HEADERS)
+
+
+# Health-check опитують часто (балансувальники, моніторинг): відповідь
+# готова заздалегідь — без серіалізації та без БД
+_HEALTH_RESPONSE = Response(
+    content=b'{"status":"ok"}',
+    media_type="application/json",
+    headers={"Cache-Control": "no-store"},
+)
+
+
 @app.get("/health")
-async def health() -> dict:
+@app.get("/healthz", include_in_schema=False)
+async def health() -> Response:
     """Простий health-check ендпоінт."""
 
-    return {"status": "ok"}
+    return _HEALTH_RESPONSE
 
 
 @app.get("/dev/git/status")
 async def dev_git_status() -> dict:
     try:
-        data = rt.git_status()
+        data = await rt.git_status_async()
         return {"ok": True, "data": data}
     except Exception as exc:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=500,
             content={"ok": False, "error": str(exc)},
         )
 
 
 @app.get("/dev/git/diff")
-async def dev_git_diff() -> dict:
+async def dev_git_diff(stat: bool = False) -> dict:
+    """git diff (обрізаний) або, з ?stat=1, лише --stat без запуску самого diff."""
     try:
-        data = rt.git_diff()
+        data = await (rt.git_diff_stat_async() if stat else rt.git_diff_async())
         return {"ok": True, "data": data}
     except Exception as exc:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=500,
             content={"ok": False, "error": str(exc)},
         )
@@ -1093,22 +495,22 @@ async def dev_git_diff() -> dict:
 
 @app.post("/dev/search")
 async def dev_search(req: SearchRequest) -> dict:
-    query = (req.query or "").strip()
+    query = req.query
     if len(query) < 2:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=422,
             content={"ok": False, "error": "Field required: query"},
         )
     try:
-        data = rt.repo_search(query)
+        data = await rt.repo_search_async(query)
         return {"ok": True, "data": data}
     except ValueError as exc:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=422,
             content={"ok": False, "error": str(exc)},
         )
     except Exception as exc:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=500,
             content={"ok": False, "error": str(exc)},
         )
@@ -1117,112 +519,334 @@ async def dev_search(req: SearchRequest) -> dict:
 @app.get("/dev/tools")
 async def dev_tools() -> list[dict]:
     if ta is None:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=503,
             content={"ok": False, "error": "tools_allowlist not available"},
         )
-    return ta.list_tools()
+    # готовий JSON: без валідації/серіалізації відповіді на кожен запит
+    return Response(content=ta.list_tools_json(), media_type="application/json")
 
 
 @app.post("/dev/tools/run")
 async def dev_tools_run(req: ToolRunRequest) -> dict:
     name = (req.name or "").strip()
     if ta is None:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=503,
             content={"ok": False, "error": "tools_allowlist not available"},
         )
     if not name:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=422,
             content={"ok": False, "error": "Field required: name"},
         )
     args = req.args or {}
     if not isinstance(args, dict):
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=422,
             content={"ok": False, "error": "Field required: args object"},
         )
     try:
-        result = ta.run_tool(name, args)
+        # Синхронні інструменти (pytest, git) — у потоці, щоб не блокувати loop
+        result = await asyncio.to_thread(ta.run_tool, name, args)
         if result.get("ok"):
             return result
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=500,
             content=result,
         )
     except ValueError as exc:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=422,
             content={"ok": False, "error": str(exc)},
         )
     except Exception as exc:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=500,
             content={"ok": False, "error": str(exc)},
         )
 
 
+@app.post("/dev/cache/invalidate")
+async def dev_cache_invalidate() -> dict:
+    """Скидає TTL-кеші читання (після змін у БД з іншого процесу) і git/пошуку."""
+    dropped = len(_READ_CACHE)
+    _READ_CACHE.clear()
+    dropped += rt.invalidate_caches()
+    return {"ok": True, "dropped": dropped}
+
+
+@app.get("/dev/metrics")
+async def dev_metrics() -> dict:
+    """Стан черги /chat — щоб підбирати MAX_PARALLEL_CHAT/CHAT_QUEUE_MAX."""
+    repo_caches = rt.cache_stats()
+    return {
+        "ok": True,
+        "data": {
+            "chat": {
+                **_CHAT_STATS,
+                "max_parallel": MAX_PARALLEL_CHAT,
+                "queue_max": CHAT_QUEUE_MAX,
+            },
+            "read_cache_entries": len(_READ_CACHE),
+            "git_cache_entries": repo_caches["git"],
+            "repo_cache_entries": repo_caches,
+        },
+    }
+
+
 @app.get("/dev/errors")
 async def dev_errors(limit: int = 10) -> dict:
     if limit <= 0:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=422,
             content={"ok": False, "error": "limit must be > 0"},
         )
     try:
-        data = get_recent_errors(limit=limit)
+        data = await asyncio.to_thread(get_recent_errors, limit=limit)
         return {"ok": True, "data": data}
     except Exception as exc:
-        return JSONResponse(
+        return _FastJSONResponse(
             status_code=500,
             content={"ok": False, "error": str(exc)},
         )
 
 
+@app.get("/dev/snapshot")
+async def dev_snapshot(errors_limit: int = 10) -> dict:
+    """git status, git diff і останні помилки одним запитом.
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest) -> ChatResponse:
-    """Чат-ендпоінт, який відповідає через HeadAgent.
-
-    Приймає `task` або `text`.
+    Усі три частини виконуються паралельно; помилка однієї не ламає інші —
+    кожна частина має власний {"ok", "data" | "error"}.
     """
+    if errors_limit <= 0:
+        return _FastJSONResponse(
+            status_code=422,
+            content={"ok": False, "error": "errors_limit must be > 0"},
+        )
+    results = await asyncio.gather(
+        rt.git_status_async(),
+        rt.git_diff_async(),
+        asyncio.to_thread(get_recent_errors, limit=errors_limit),
+        return_exceptions=True,
+    )
+    parts = {}
+    for name, value in zip(("status", "diff", "errors"), results):
+        if isinstance(value, Exception):
+            parts[name] = {"ok": False, "error": str(value)}
+        else:
+            parts[name] = {"ok": True, "data": value}
+    return {"ok": True, "data": parts}
+
+
+
+# Межі для тексту задачі: перевіряємо до будь-якої роботи агента
+CHAT_TASK_MAX = int(os.getenv("CHAT_TASK_MAX", "8192"))
+_CONTROL_CHARS_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+
 
-    task = (req.task or req.text or "").strip()
+def _parse_chat_request(req: ChatRequest) -> tuple[str, str]:
+    """Валідує запит /chat і повертає (task, mode)."""
+    task = req.task or req.text or ""
     if not task:
         raise HTTPException(status_code=422, detail="Field required: task (or text)")
+    if len(task) > CHAT_TASK_MAX:
+        raise HTTPException(status_code=413, detail=f"Task too large (max {CHAT_TASK_MAX} chars)")
+    if _CONTROL_CHARS_RE.search(task):
+        raise HTTPException(status_code=400, detail="Task contains control characters")
 
-    mode = (req.mode or "head").strip().lower()
+    mode = (req.mode or "head").lower()
     if mode not in ("head", "writer"):
         raise HTTPException(status_code=422, detail="Invalid mode (use head|writer)")
+    return task, mode
 
+
+async def _chat_reply(task: str, mode: str, on_delta: Any = None) -> str:
+    # HeadAgent/Writer працюють синхронно (LLM, БД, git), тому виконуємо їх у
+    # потоці — інакше один /chat блокує event loop для всіх інших запитів.
+    # on_delta (лише writer) отримує шматки відповіді LLM по мірі генерації.
     if mode == "writer":
         try:
-            reply = call_writer_llm(task)
+            reply = await _run_chat_job(call_writer_llm, task, on_delta)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="WriterAgent timeout")
         except Exception as exc:
             raise HTTPException(status_code=500, detail=f"WriterAgent error: {exc}")
         try:
-            HEAD.log_writer_shadow(task, reply)
+            await asyncio.to_thread(HEAD.log_writer_shadow, task, reply)
         except Exception:
             pass
-    else:
+        return reply
+
+    try:
+        return await _run_chat_job(_head_handle, task)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="HeadAgent timeout")
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"HeadAgent error: {exc}")
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest) -> Response:
+    """Чат-ендпоінт, який відповідає через HeadAgent.
+
+    Приймає `task` або `text`.
+    """
+    task, mode = _parse_chat_request(req)
+    _admit_chat()
+    try:
+        reply = await _chat_reply(task, mode)
+    finally:
+        _release_chat()
+    # response_model лишаємо для OpenAPI, а відповідь віддаємо готовою:
+    # без створення ChatResponse і повторної валідації/серіалізації FastAPI
+    reply, full_id = _cap_reply(reply)
+    return _FastJSONResponse({"task": task, "auto": req.auto, "reply": reply, "full_id": full_id})
+
+
+@app.get("/chat/{full_id}/full")
+async def chat_full_reply(full_id: str) -> Response:
+    """Повна (необрізана) відповідь /chat, поки вона є в LRU."""
+    reply = _FULL_REPLIES.get(full_id)
+    if reply is None:
+        raise HTTPException(status_code=404, detail="Full reply not found (expired)")
+    return Response(content=reply, media_type="text/plain; charset=utf-8")
+
+
+# Як часто слати SSE-коментар, поки агент думає (щоб проксі не рвали з'єднання)
+CHAT_STREAM_KEEPALIVE_S = 10.0
+
+
+def _sse(event: str, data: str) -> str:
+    """Одна SSE-подія; багаторядкові дані — окремими `data:` рядками."""
+    lines = (data or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return f"event: {event}\n" + "".join(f"data: {line}\n" for line in lines) + "\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest) -> StreamingResponse:
+    """Те саме, що /chat, але як Server-Sent Events.
+
+    Одразу віддає `start`, поки агент працює — keepalive-коментарі, у режимі
+    writer — `delta` з шматками тексту LLM по мірі генерації; далі `message`
+    з повною відповіддю (вона замінює дельти) та `done` (або `error`).
+    """
+    task, mode = _parse_chat_request(req)
+    # 429 віддаємо до початку стріму; місце звільняється, коли стрім закінчено
+    _admit_chat()
+    released = False
+
+    def release_once() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            _release_chat()
+
+    async def events() -> AsyncIterator[str]:
+        # finally тут спрацьовує і при відключенні клієнта (генератор закривають),
+        # на відміну від background-задачі відповіді
         try:
-            reply = HEAD.handle(task, MEMORY)
-        except Exception as exc:
-            raise HTTPException(status_code=500, detail=f"HeadAgent error: {exc}")
+            yield _sse("start", mode)
+            loop = asyncio.get_running_loop()
+            deltas: asyncio.Queue[str] = asyncio.Queue()
+
+            def on_delta(chunk: str) -> None:
+                # викликається з потоку агента
+                loop.call_soon_threadsafe(deltas.put_nowait, chunk)
+
+            job = asyncio.ensure_future(_chat_reply(task, mode, on_delta if mode == "writer" else None))
+            try:
+                while not job.done():
+                    getter = asyncio.ensure_future(deltas.get())
+                    done, _ = await asyncio.wait(
+                        {job, getter},
+                        timeout=CHAT_STREAM_KEEPALIVE_S,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if getter in done:
+                        yield _sse("delta", getter.result())
+                        continue
+                    getter.cancel()
+                    if not done:
+                        yield ": keepalive\n\n"
+                reply = job.result()
+            except HTTPException as exc:
+                yield _sse("error", str(exc.detail))
+                return
+            finally:
+                # клієнт відключився — не чекаємо відповідь даремно
+                if not job.done():
+                    job.cancel()
+            reply, full_id = _cap_reply(reply)
+            yield _sse("message", reply)
+            if full_id:
+                yield _sse("truncated", full_id)
+            yield _sse("done", "")
+        finally:
+            release_once()
+
+    return StreamingResponse(
+        events(),
+        # запасний шлях: якщо генератор так і не стартував, finally не виконається
+        background=BackgroundTask(release_once),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    return ChatResponse(task=task, auto=req.auto, reply=reply)
 
+def _encode_json(payload: Any) -> tuple[str, bytes]:
+    """Серіалізує payload один раз і повертає (ETag, bytes) для кешу."""
+    if orjson is not None:
+        body = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _etag_for(body), body
+
+
+def _etag_json_response(request: Request, etag: str, body: bytes) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "private, must-revalidate"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _projects_payload() -> tuple[str, bytes]:
+    return _encode_json({"projects": get_projects()})
+
+
+@lru_cache(maxsize=512)
+def _outline_payload_at(book_id: int, version: str) -> tuple[str, bytes]:
+    return _encode_json(get_book_outline(book_id))
+
+
+def _outline_payload(book_id: int) -> Optional[tuple[str, bytes]]:
+    """Outline з кешу, поки версія книги в БД не змінилась; None — книги немає.
+
+    На попаданні — один індексований SELECT версії замість обходу глав і сцен;
+    зміни з будь-якого процесу (CLI, агенти) інвалідовують кеш одразу.
+    """
+    version = get_book_version(book_id)
+    if version is None:
+        return None
+    return _outline_payload_at(book_id, version)
+
+
+def _outline_data(book_id: int) -> Any:
+    """Outline як об'єкт (для /bootstrap) з того ж кешу, що й /writing/outline; None — книги немає."""
+    payload = _outline_payload(book_id)
+    if payload is None:
+        return None
+    return orjson.loads(payload[1]) if orjson is not None else json.loads(payload[1])
 
 
 # New endpoints for listing projects and getting book outline
 @app.get("/projects")
-async def list_projects() -> dict:
+async def list_projects(request: Request) -> Response:
     """
     Повертає список усіх проєктів для UI.
     """
-    projects = get_projects()
-    return {"projects": projects}
+    etag, body = await _cached_read("projects", _projects_payload)
+    return _etag_json_response(request, etag, body)
 
 
 # Endpoint for current active project
@@ -1232,7 +856,7 @@ async def current_project() -> dict:
 
     Використовує get_current_project() з db.py.
     """
-    project = get_current_project()
+    project = await _cached_read("current_project", get_current_project)
     if not project:
         raise HTTPException(status_code=404, detail="Current project not found")
     return {"project": project}
@@ -1240,11 +864,11 @@ async def current_project() -> dict:
 
 @app.post("/projects/current")
 async def set_current_project_api(update: CurrentProjectUpdate) -> dict:
-    name = (update.project or "").strip()
+    name = update.project
     if not name:
         raise HTTPException(status_code=422, detail="Field required: project")
-    set_current_project(name)
-    return {"project": get_current_project()}
+    await asyncio.to_thread(set_current_project, name)
+    return {"project": await _cached_read("current_project", get_current_project)}
 
 
 # --- LLM config endpoints for current project ---
@@ -1252,33 +876,54 @@ async def set_current_project_api(update: CurrentProjectUpdate) -> dict:
 @app.get("/projects/current/llm_config")
 async def current_project_llm_config() -> dict:
     """Повертає LLM-конфіг для поточного проєкту."""
-    project = get_current_project()
+    project = await _cached_read("current_project", get_current_project)
     if not project:
         raise HTTPException(status_code=404, detail="Current project not found")
-    cfg = get_llm_config(project)
+    cfg = await _cached_read(("llm_config", project), get_llm_config, project)
     return {"project": project, "llm_config": cfg}
 
 
 @app.post("/projects/current/llm_config")
 async def update_current_project_llm_config(update: LLMConfigUpdate) -> dict:
     """Оновлює LLM-конфіг для поточного проєкту (dev endpoint)."""
-    project = get_current_project()
+    project = await _cached_read("current_project", get_current_project)
     if not project:
         raise HTTPException(status_code=404, detail="Current project not found")
 
-    if update.base_url is not None:
-        set_project_setting(project, "llm.base_url", update.base_url)
-    if update.head_model is not None:
-        set_project_setting(project, "llm.head_model", update.head_model)
-    if update.writer_model is not None:
-        set_project_setting(project, "llm.writer_model", update.writer_model)
+    values = {
+        f"llm.{field}": value
+        for field, value in (
+            ("base_url", update.base_url),
+            ("head_model", update.head_model),
+            ("writer_model", update.writer_model),
+        )
+        if value is not None
+    }
+
+    def _apply() -> dict:
+        # усі поля — однією транзакцією (один commit замість трьох)
+        set_project_settings(project, values)
+        return get_llm_config(project)
 
-    cfg = get_llm_config(project)
+    cfg = await asyncio.to_thread(_apply)
     return {"project": project, "llm_config": cfg}
 
 
+async def _resolve_book_id(project_id: int) -> int:
+    """book_id письменницької книги проєкту; 404, якщо проєкту немає."""
+    # Кешуємо лише чисте читання; ensure (може створити книгу чи змінити тип
+    # проєкту) — тільки на промаху, без кешу: він сам піднімає data_version.
+    book = await _cached_read(("book_for_project", project_id), get_book_for_project, project_id)
+    if book is None:
+        try:
+            book = await asyncio.to_thread(ensure_writing_project_for_project_id, project_id)
+        except ValueError as exc:
+            raise HTTPException(status_code=404, detail=str(exc))
+    return int(book["id"])
+
+
 @app.get("/writing/outline")
-async def writing_outline(project_id: int | None = None, book_id: int | None = None):
+async def writing_outline(request: Request, project_id: int | None = None, book_id: int | None = None):
     """
     Повертає структуру книги (outline).
 
@@ -1286,34 +931,94 @@ async def writing_outline(project_id: int | None = None, book_id: int | None = N
     Якщо переданий project_id, шукаємо перший відповідний writing‑проєкт і
     використовуємо його id як book_id.
     """
-    if book_id is None and project_id is None:
-        raise HTTPException(status_code=400, detail="Specify project_id or book_id")
+    if book_id is None:
+        if project_id is None:
+            raise HTTPException(status_code=400, detail="Specify project_id or book_id")
+        book_id = await _resolve_book_id(project_id)
+
+    payload = await asyncio.to_thread(_outline_payload, book_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail=f"Writing project (book) with id={book_id} not found")
+    return _etag_json_response(request, *payload)
+
+
+def _first_book_id(project_name: str) -> Optional[int]:
+    """id першої книги проєкту або None (лише читання, без створення книги)."""
+    books = get_writing_projects(project_name=project_name)
+    if not books:
+        return None
+    return int(books[0]["id"])
 
-    # Якщо не передали book_id, але є project_id — шукаємо книгу для цього проєкту.
-    if book_id is None and project_id is not None:
-        try:
-            book = ensure_writing_project_for_project_id(project_id)
-        except ValueError as exc:
-            raise HTTPException(status_code=404, detail=str(exc))
-        book_id = int(book["id"])
 
-    assert book_id is not None
+@app.get("/bootstrap")
+async def bootstrap(book_id: int | None = None) -> dict:
+    """
+    Усе, що потрібно UI при завантаженні, одним запитом:
+    поточний проєкт, список проєктів і outline книги — за book_id або,
+    якщо його не передано, першої книги поточного writing-проєкту.
+
+    Список проєктів і outline читаються паралельно в потоках.
+    """
     try:
-        outline = get_book_outline(book_id)
+        return await _bootstrap_payload(book_id)
     except ValueError as exc:
-        # Якщо книга не знайдена, повертаємо 404
+        # Книга не знайдена
         raise HTTPException(status_code=404, detail=str(exc))
-    return outline
+
+
+async def _bootstrap_payload(book_id: int | None = None) -> dict:
+    project = await _cached_read("current_project", get_current_project)
+
+    async def _outline() -> Any:
+        if book_id is not None:
+            outline = await asyncio.to_thread(_outline_data, book_id)
+            if outline is None:
+                raise ValueError(f"Writing project (book) with id={book_id} not found")
+            return outline
+        if not project:
+            return None
+        first = await _cached_read(("project_first_book", project), _first_book_id, project)
+        if first is None:
+            return None
+        return await asyncio.to_thread(_outline_data, first)
+
+    projects, outline = await asyncio.gather(
+        _cached_read("projects_data", get_projects),
+        _outline(),
+    )
+
+    if book_id is None:
+        # Структуру книги UI показує лише для writing-проєктів
+        current = next((p for p in projects if p.get("name") == project), None)
+        if not current or current.get("type") != "writing":
+            outline = None
+    return {"project": project, "projects": projects, "outline": outline}
 
 
 @app.get("/writing/projects")
 async def writing_projects(project_name: Optional[str] = None) -> dict:
     name = (project_name or "").strip() or None
-    books = get_writing_projects(project_name=name)
+    books = await asyncio.to_thread(get_writing_projects, project_name=name)
     return {"project_name": name, "books": books}
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("server:app", host="127.0.0.1", port=8000, reload=True)
+    # uvloop + httptools (uvicorn[standard]) дають помітно більший QPS; "auto"
+    # бере їх, якщо встановлені. Воркер за замовчуванням один: пам'ять, HeadAgent
+    # і кеші живуть у процесі, тож кілька воркерів — лише свідомо (UVICORN_WORKERS).
+    reload = os.getenv("UVICORN_RELOAD", "1") == "1"
+    uvicorn.run(
+        "server:app",
+        host="127.0.0.1",
+        port=8000,
+        loop="auto",
+        http="auto",
+        reload=reload,
+        workers=1 if reload else max(1, int(os.getenv("UVICORN_WORKERS", "1"))),
+        # UI робить серію запитів (bootstrap, assets, chat/stream) — тримаємо
+        # з'єднання довше за дефолтні 5 с, щоб не платити за новий TCP-хендшейк
+        timeout_keep_alive=int(os.getenv("UVICORN_KEEPALIVE_S", "30")),
+        h11_max_incomplete_event_size=16 * 1024,
+    )
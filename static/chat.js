@@ -0,0 +1,692 @@
+const taskEl = document.getElementById('task');
+const autoEl = document.getElementById('auto');
+const modeEl = document.getElementById('mode');
+const sendBtn = document.getElementById('send');
+const logEl = document.getElementById('log');
+const statusEl = document.getElementById('status');
+const toggleStructureBtn = document.getElementById('toggle-structure');
+const toggleDevBtn = document.getElementById('toggle-dev');
+const structurePanel = document.getElementById('structure-panel');
+const structureBody = document.querySelector('.structure-body');
+const refreshOutlineBtn = document.getElementById('refresh-outline');
+const projectsListEl = document.getElementById('projects-list');
+const devPanel = document.getElementById('dev-panel');
+const devOutput = document.getElementById('dev-output');
+const devSearchInput = document.getElementById('dev-search-q');
+const devSearchBtn = document.getElementById('dev-search-btn');
+const devRefreshStatusBtn = document.getElementById('dev-refresh-status');
+const devRefreshDiffBtn = document.getElementById('dev-refresh-diff');
+const devRefreshErrorsBtn = document.getElementById('dev-refresh-errors');
+const devPatchEl = document.getElementById('dev-patch');
+const devPatchCheckBtn = document.getElementById('dev-patch-check');
+const devPatchApplyBtn = document.getElementById('dev-patch-apply');
+let structureVisible = false;
+let outlineLoaded = false;
+let devVisible = false;
+// Поточний проєкт, обраний у сайдбарі
+let currentProjectId = null;
+let currentProjectType = null;
+let currentProjectName = null;
+
+if (statusEl) {
+    statusEl.textContent = 'UI JS loaded';
+    statusEl.classList.remove('error');
+}
+
+function reportUiError(message) {
+    if (!statusEl) return;
+    statusEl.textContent = 'UI error: ' + message;
+    statusEl.classList.add('error');
+}
+
+window.addEventListener('error', (e) => {
+    const msg = e && e.message ? e.message : 'unknown';
+    reportUiError(msg);
+});
+window.addEventListener('unhandledrejection', (e) => {
+    const msg = e && e.reason ? e.reason : 'unhandled rejection';
+    reportUiError(msg);
+});
+
+// Екранування даних з БД перед вставкою в innerHTML
+const ESC_MAP = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+
+function esc(value) {
+    return String(value ?? '').replace(/[&<>"']/g, (c) => ESC_MAP[c]);
+}
+
+function projectNameOf(project) {
+    if (typeof project === 'string') {
+        return project;
+    }
+    if (project && typeof project.name === 'string') {
+        return project.name;
+    }
+    return null;
+}
+
+// Дані першого завантаження сервер вбудовує в сторінку (див. root() у server.py);
+// беремо їх один раз, далі — звичайний /bootstrap
+function takeInlineBootstrap() {
+    const el = document.getElementById('bootstrap-data');
+    if (!el) return null;
+    el.remove();
+    try {
+        return JSON.parse(el.textContent);
+    } catch (err) {
+        console.error(err);
+        return null;
+    }
+}
+
+async function loadProjects() {
+    if (!projectsListEl) return;
+
+    try {
+        let data = takeInlineBootstrap();
+        if (!data) {
+            projectsListEl.innerHTML =
+                '<div class="project-item"><div class="project-name">Завантаження...</div></div>';
+            // Поточний проєкт і список приходять одним запитом
+            const resp = await fetch('/bootstrap');
+            if (!resp.ok) {
+                throw new Error('HTTP ' + resp.status);
+            }
+            data = await resp.json();
+        }
+        currentProjectName = projectNameOf(data.project);
+        renderProjects(data.projects || [], currentProjectName);
+        // Структура поточної книги вже прийшла разом зі списком проєктів
+        if (data.outline) {
+            renderOutline(data.outline);
+            outlineLoaded = true;
+        }
+        if (statusEl) {
+            statusEl.textContent = 'Projects loaded';
+            statusEl.classList.remove('error');
+        }
+    } catch (err) {
+        console.error(err);
+        reportUiError(err.message || err);
+        projectsListEl.innerHTML =
+            '<div class="project-item"><div class="project-name">Помилка завантаження проєктів</div></div>';
+    }
+}
+
+function renderProjects(projects, currentName) {
+    if (!projectsListEl) return;
+
+    if (!projects.length) {
+        projectsListEl.innerHTML =
+            '<div class="project-item"><div class="project-name">Немає проєктів</div></div>';
+        currentProjectId = null;
+        currentProjectType = null;
+        return;
+    }
+
+    const parts = [];
+    for (const p of projects) {
+        const isActive = (p.name === currentName);
+        // Якщо ще не обрано поточний проєкт — беремо активний з currentName
+        if (isActive && currentProjectId === null) {
+            currentProjectId = p.id;
+            currentProjectType = p.type || null;
+        }
+        parts.push(
+            '<div class="project-item' + (isActive ? ' active' : '') + '" ' +
+            'data-project-id="' + esc(p.id) + '" ' +
+            'data-project-type="' + esc(p.type) + '">',
+            '<div class="project-name">' + esc(p.name || 'Без назви') + '</div>'
+        );
+        if (p.type) {
+            parts.push('<div class="project-meta">' + esc(p.type) + '</div>');
+        }
+        parts.push('</div>');
+    }
+    projectsListEl.innerHTML = parts.join('');
+
+    // Навішуємо клік‑обробники для вибору поточного проєкту
+    const items = projectsListEl.querySelectorAll('.project-item');
+    items.forEach((el) => {
+        el.addEventListener('click', async () => {
+            const name = (el.querySelector('.project-name') || {}).textContent || '';
+            try {
+                const resp = await fetch('/projects/current', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({
+                        project: name
+                    })
+                });
+                if (!resp.ok) {
+                    throw new Error('HTTP ' + resp.status);
+                }
+                const data = await resp.json();
+                const project = data.project;
+                if (typeof project === 'string') {
+                    currentProjectName = project;
+                } else if (project && typeof project.name === 'string') {
+                    currentProjectName = project.name;
+                } else {
+                    currentProjectName = name;
+                }
+
+                const pid = el.getAttribute('data-project-id');
+                const ptype = el.getAttribute('data-project-type') || null;
+                currentProjectId = pid ? parseInt(pid, 10) : null;
+                currentProjectType = ptype;
+
+                items.forEach((i) => i.classList.remove('active'));
+                el.classList.add('active');
+
+                // Якщо відкрита панель структури — оновлюємо її для вибраного проєкту
+                if (structureVisible) {
+                    loadOutlineForCurrentProject();
+                }
+            } catch (err) {
+                console.error(err);
+                reportUiError(err.message || err);
+            }
+        });
+    });
+}
+
+if (toggleStructureBtn && structurePanel) {
+    toggleStructureBtn.addEventListener('click', () => {
+        structureVisible = !structureVisible;
+        if (structureVisible) {
+            structurePanel.classList.remove('hidden');
+            toggleStructureBtn.textContent = 'Структура ▲';
+            // Перший раз при відкритті — завантажуємо структуру
+            if (!outlineLoaded) {
+                loadOutlineForCurrentProject();
+            }
+        } else {
+            structurePanel.classList.add('hidden');
+            toggleStructureBtn.textContent = 'Структура ▼';
+        }
+    });
+}
+
+if (refreshOutlineBtn && structurePanel) {
+    refreshOutlineBtn.addEventListener('click', () => {
+        loadOutlineForCurrentProject();
+    });
+}
+
+function setDevOutput(text) {
+    if (!devOutput) return;
+    devOutput.textContent = text || '';
+}
+
+async function devRunTool(name, args) {
+    try {
+        const resp = await fetch('/dev/tools/run', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                name: name,
+                args: args || {}
+            })
+        });
+        if (!resp.ok) {
+            try {
+                const data = await resp.json();
+                const msg = (data && (data.error || data.detail)) || ('HTTP ' + resp.status);
+                return { ok: false, error: msg };
+            } catch (e) {
+                try {
+                    const text = await resp.text();
+                    return { ok: false, error: text || ('HTTP ' + resp.status) };
+                } catch (_) {
+                    return { ok: false, error: 'HTTP ' + resp.status };
+                }
+            }
+        }
+        const data = await resp.json();
+        if (data && data.ok) {
+            return { ok: true, data: data.data };
+        }
+        const msg = (data && (data.error || data.detail)) || 'unknown error';
+        return { ok: false, error: msg };
+    } catch (err) {
+        return { ok: false, error: err.message };
+    }
+}
+
+async function loadDevStatus() {
+    const r = await devRunTool('git_status', {});
+    if (r.ok) {
+        setDevOutput(JSON.stringify(r.data, null, 2));
+    } else {
+        setDevOutput('ERROR: ' + r.error);
+    }
+}
+
+async function loadDevDiff() {
+    const r = await devRunTool('git_diff', {});
+    if (r.ok) {
+        if (r.data && r.data.stat_only) {
+            setDevOutput(r.data.stat || '');
+        } else {
+            setDevOutput((r.data && r.data.diff) || '');
+        }
+    } else {
+        setDevOutput('ERROR: ' + r.error);
+    }
+}
+
+async function loadDevErrors() {
+    const r = await devRunTool('recent_errors', { limit: 5 });
+    if (r.ok) {
+        setDevOutput(JSON.stringify(r.data, null, 2));
+    } else {
+        setDevOutput('ERROR: ' + r.error);
+    }
+}
+
+async function devSearch() {
+    if (!devSearchInput) return;
+    const query = devSearchInput.value.trim();
+    if (query.length < 2) {
+        setDevOutput('Вкажи щонайменше 2 символи для пошуку.');
+        return;
+    }
+    const r = await devRunTool('repo_search', { query: query, max_matches: 50 });
+    if (r.ok) {
+        if (!r.data || !r.data.found) {
+            setDevOutput('нічого не знайдено');
+        } else {
+            setDevOutput(r.data.matches || '');
+        }
+    } else {
+        setDevOutput('ERROR: ' + r.error);
+    }
+}
+
+async function devPatchCheck() {
+    if (!devPatchEl) return;
+    const patch = devPatchEl.value || '';
+    if (patch.trim().length < 10) {
+        setDevOutput('Patch too short');
+        return;
+    }
+    const r = await devRunTool('git_apply_check', { patch: patch });
+    if (!r.ok) {
+        setDevOutput('ERROR: ' + r.error);
+        return;
+    }
+    const rc = r.data && typeof r.data.returncode !== 'undefined' ? r.data.returncode : 'unknown';
+    const err = (r.data && r.data.stderr) || '';
+    if (rc === 0) {
+        setDevOutput(err ? ('OK\n' + err) : 'OK');
+    } else {
+        setDevOutput('ERROR: returncode=' + rc + (err ? '\n' + err : ''));
+    }
+}
+
+async function devPatchApply() {
+    if (!devPatchEl) return;
+    const patch = devPatchEl.value || '';
+    if (patch.trim().length < 10) {
+        setDevOutput('Patch too short');
+        return;
+    }
+    const check = await devRunTool('git_apply_check', { patch: patch });
+    if (!check.ok) {
+        setDevOutput('ERROR: ' + check.error);
+        return;
+    }
+    const checkRc = check.data && typeof check.data.returncode !== 'undefined' ? check.data.returncode : 'unknown';
+    if (checkRc !== 0) {
+        const err = (check.data && check.data.stderr) || '';
+        setDevOutput('ERROR: returncode=' + checkRc + (err ? '\n' + err : ''));
+        return;
+    }
+    const apply = await devRunTool('git_apply', { patch: patch });
+    if (!apply.ok) {
+        setDevOutput('ERROR: ' + apply.error);
+        return;
+    }
+    const rc = apply.data && typeof apply.data.returncode !== 'undefined' ? apply.data.returncode : 'unknown';
+    const err = (apply.data && apply.data.stderr) || '';
+    if (rc === 0) {
+        setDevOutput(err ? ('Applied\n' + err) : 'Applied');
+    } else {
+        setDevOutput('ERROR: returncode=' + rc + (err ? '\n' + err : ''));
+    }
+}
+
+if (toggleDevBtn && devPanel) {
+    toggleDevBtn.addEventListener('click', () => {
+        devVisible = !devVisible;
+        if (devVisible) {
+            devPanel.classList.remove('hidden');
+        } else {
+            devPanel.classList.add('hidden');
+        }
+    });
+}
+
+if (devRefreshStatusBtn) {
+    devRefreshStatusBtn.addEventListener('click', () => {
+        loadDevStatus();
+    });
+}
+if (devRefreshDiffBtn) {
+    devRefreshDiffBtn.addEventListener('click', () => {
+        loadDevDiff();
+    });
+}
+if (devRefreshErrorsBtn) {
+    devRefreshErrorsBtn.addEventListener('click', () => {
+        loadDevErrors();
+    });
+}
+if (devSearchBtn) {
+    devSearchBtn.addEventListener('click', () => {
+        devSearch();
+    });
+}
+if (devPatchCheckBtn) {
+    devPatchCheckBtn.addEventListener('click', () => {
+        devPatchCheck();
+    });
+}
+if (devPatchApplyBtn) {
+    devPatchApplyBtn.addEventListener('click', () => {
+        devPatchApply();
+    });
+}
+
+function loadOutlineForCurrentProject() {
+    if (!structureBody) return;
+
+    // Поки що для non-writing проєктів показуємо простий текст.
+    if (!currentProjectId) {
+        structureBody.innerHTML = '<p>Поточний проєкт не вибрано.</p>';
+        return;
+    }
+    if (currentProjectType !== 'writing') {
+        structureBody.innerHTML =
+            '<p>Для проєкту типу <code>' + (currentProjectType || 'unknown') +
+            '</code> структура книги ще не налаштована.</p>';
+        return;
+    }
+
+    // Тепер запитуємо outline за project_id, без жорсткого book_id.
+    loadOutlineForProject(currentProjectId);
+}
+
+async function loadOutlineForProject(projectId) {
+    if (!structureBody) return;
+    // Якщо структура вже показана — оновлюємо її на місці, без заглушки
+    if (!outlineListEl || !outlineListEl.isConnected) {
+        structureBody.innerHTML = '<p>Завантаження структури…</p>';
+    }
+
+    try {
+        const resp = await fetch('/writing/outline?project_id=' + projectId);
+        if (!resp.ok) {
+            throw new Error('HTTP ' + resp.status);
+        }
+        const data = await resp.json();
+        renderOutline(data);
+        outlineLoaded = true;
+    } catch (err) {
+        console.error(err);
+        structureBody.innerHTML =
+            '<p>Не вдалося завантажити структуру: ' + err.message + '</p>';
+    }
+}
+
+// Вузли outline кешуються між оновленнями: перемальовуємо лише шапку книги
+// та ті глави, дані яких змінилися (ключ — id книги + id глави)
+let outlineHeadEl = null;
+let outlineListEl = null;
+let outlineHeadSig = null;
+const outlineChapterNodes = new Map();
+
+function outlineHeadHtml(book, hasChapters) {
+    const parts = [];
+    parts.push('<div><strong>Книга:</strong> ' + esc(book.title) +
+               ' <span style="color:#9ca3af;">[' + esc(book.status || 'unknown') + ']</span></div>');
+
+    if (book.project_name) {
+        parts.push('<div style="font-size:12px;color:#9ca3af;">Проєкт: ' +
+                   esc(book.project_name) + '</div>');
+    }
+
+    if (book.synopsis) {
+        parts.push('<p style="margin-top:4px;">' + esc(book.synopsis) + '</p>');
+    }
+
+    if (!hasChapters) {
+        parts.push('<p>Глави ще не додані.</p>');
+    }
+    return parts.join('');
+}
+
+function outlineChapterHtml(ch) {
+    const parts = [];
+    parts.push('<li>',
+               '<div><strong>Глава ' + esc(ch.number || '') + ':</strong> ' +
+               esc(ch.title || '') +
+               ' <span style="color:#9ca3af;">[' + esc(ch.status || 'unknown') + ']</span></div>');
+
+    if (ch.summary) {
+        parts.push('<div style="font-size:12px;color:#9ca3af;margin-bottom:2px;">' +
+                   esc(ch.summary) + '</div>');
+    }
+
+    const scenes = ch.scenes || [];
+    if (scenes.length) {
+        parts.push('<ul style="margin:4px 0 4px 16px;padding-left:12px;">');
+        for (const sc of scenes) {
+            parts.push('<li><span>' + esc(sc.title || 'Сцена') +
+                       ' <span style="color:#9ca3af;">[' +
+                       esc(sc.status || 'unknown') + ']</span></span></li>');
+        }
+        parts.push('</ul>');
+    }
+
+    parts.push('</li>');
+    return parts.join('');
+}
+
+function resetOutlineNodes() {
+    outlineHeadEl = null;
+    outlineListEl = null;
+    outlineHeadSig = null;
+    outlineChapterNodes.clear();
+}
+
+function renderOutline(data) {
+    if (!structureBody) return;
+
+    if (!data || !data.book) {
+        resetOutlineNodes();
+        structureBody.innerHTML = '<p>Структура відсутня.</p>';
+        return;
+    }
+
+    const book = data.book;
+    const chapters = data.chapters || [];
+
+    // Контейнер міг бути перезаписаний (повідомлення про помилку тощо)
+    if (!outlineListEl || !outlineListEl.isConnected) {
+        resetOutlineNodes();
+        structureBody.innerHTML = '';
+        outlineHeadEl = document.createElement('div');
+        outlineListEl = document.createElement('ul');
+        outlineListEl.style.cssText = 'margin:8px 0 0 0; padding-left:16px;';
+        structureBody.append(outlineHeadEl, outlineListEl);
+    }
+
+    const headSig = JSON.stringify([book, chapters.length > 0]);
+    if (headSig !== outlineHeadSig) {
+        outlineHeadEl.innerHTML = outlineHeadHtml(book, chapters.length > 0);
+        outlineHeadSig = headSig;
+    }
+    outlineListEl.hidden = !chapters.length;
+
+    const seen = new Set();
+    chapters.forEach((ch, idx) => {
+        const key = book.id + ':' + (ch.id ?? ('#' + idx));
+        const sig = JSON.stringify(ch);
+        let entry = outlineChapterNodes.get(key);
+        if (!entry || entry.sig !== sig) {
+            const tpl = document.createElement('template');
+            tpl.innerHTML = outlineChapterHtml(ch);
+            const node = tpl.content.firstElementChild;
+            if (entry) {
+                entry.node.replaceWith(node);
+            }
+            entry = { sig, node };
+            outlineChapterNodes.set(key, entry);
+        }
+        seen.add(key);
+        // Порядок глав: переставляємо вузол, лише якщо він не на своєму місці
+        if (outlineListEl.children[idx] !== entry.node) {
+            outlineListEl.insertBefore(entry.node, outlineListEl.children[idx] || null);
+        }
+    });
+
+    for (const [key, entry] of outlineChapterNodes) {
+        if (!seen.has(key)) {
+            entry.node.remove();
+            outlineChapterNodes.delete(key);
+        }
+    }
+}
+
+async function send() {
+    const task = taskEl.value.trim();
+    if (!task) return;
+    sendBtn.disabled = true;
+    statusEl.textContent = 'Виконується...';
+    statusEl.classList.remove('error');
+
+    const mode = (modeEl && modeEl.value) ? modeEl.value : 'head';
+    const agentLabel = mode === 'writer' ? 'WriterAgent' : 'HeadAgent';
+
+    appendMessage('You', task);
+    taskEl.value = '';
+
+    try {
+        const resp = await fetch('/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                task: task,
+                auto: autoEl.checked,
+                mode: mode
+            })
+        });
+        if (!resp.ok) {
+            throw new Error('HTTP ' + resp.status);
+        }
+        // Бульбашка з'являється одразу, текст приходить подією message
+        const bubble = appendMessage(agentLabel, '…');
+        let finished = false;
+        let streamed = false;
+        await readEvents(resp, (event, data) => {
+            if (event === 'delta') {
+                // Writer стрімить текст шматками; фінальний message його замінить
+                if (!streamed) {
+                    bubble.textContent = '';
+                    streamed = true;
+                }
+                bubble.append(data);
+                logEl.scrollTop = logEl.scrollHeight;
+            } else if (event === 'message') {
+                bubble.textContent = data || '(порожня відповідь)';
+                logEl.scrollTop = logEl.scrollHeight;
+            } else if (event === 'truncated') {
+                // Відповідь обрізано сервером — повний текст за посиланням
+                const link = document.createElement('a');
+                link.href = '/chat/' + encodeURIComponent(data) + '/full';
+                link.target = '_blank';
+                link.rel = 'noopener';
+                link.textContent = 'Показати повну відповідь';
+                bubble.append('\n', link);
+                logEl.scrollTop = logEl.scrollHeight;
+            } else if (event === 'error') {
+                bubble.remove();
+                throw new Error(data);
+            } else if (event === 'done') {
+                finished = true;
+            }
+        });
+        if (!finished) {
+            throw new Error("з'єднання перервано");
+        }
+        statusEl.textContent = 'Готово';
+    } catch (err) {
+        console.error(err);
+        statusEl.textContent = 'Помилка: ' + err.message;
+        statusEl.classList.add('error');
+        appendMessage(agentLabel, 'Помилка при виклику /chat: ' + err.message);
+    } finally {
+        sendBtn.disabled = false;
+        taskEl.focus();
+    }
+}
+
+// Мінімальний парсер Server-Sent Events поверх fetch
+// (EventSource не вміє POST з JSON-тілом)
+async function readEvents(resp, onEvent) {
+    const reader = resp.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += decoder.decode(value, { stream: true });
+        let idx;
+        while ((idx = buf.indexOf('\n\n')) !== -1) {
+            const raw = buf.slice(0, idx);
+            buf = buf.slice(idx + 2);
+            if (raw.startsWith(':')) continue;  // keepalive
+            let event = 'message';
+            const data = [];
+            for (const line of raw.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data.push(line.slice(6));
+            }
+            onEvent(event, data.join('\n'));
+        }
+    }
+}
+
+function appendMessage(who, text) {
+    const div = document.createElement('div');
+    div.className = 'msg ' + (who === 'You' ? 'me' : 'bot');
+    const whoEl = document.createElement('div');
+    whoEl.className = 'who';
+    whoEl.textContent = who;
+    const bubble = document.createElement('div');
+    bubble.className = 'bubble';
+    bubble.textContent = text;
+    div.appendChild(whoEl);
+    div.appendChild(bubble);
+    logEl.appendChild(div);
+    logEl.scrollTop = logEl.scrollHeight;
+    return bubble;
+}
+
+// При завантаженні сторінки одразу підтягуємо список проєктів
+loadProjects();
+sendBtn.addEventListener('click', send);
+taskEl.addEventListener('keydown', (e) => {
+    if (e.key === 'Enter' && (e.metaKey || e.ctrlKey)) {
+        e.preventDefault();
+        send();
+    }
+});
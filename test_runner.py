@@ -1,25 +1,31 @@
 import json
 from collections import Counter
 
+try:
+    import orjson
+except ImportError:  # orjson опційний, stdlib json як фолбек
+    orjson = None  # type: ignore
+
 from agents.supervisor import Supervisor
 from memory.store import load_memory, save_memory, set_flag
 
 def main():
-    with open("tests/sample_tasks.json", "r", encoding="utf-8") as f:
-        tasks = json.load(f)["tasks"]
+    with open("tests/sample_tasks.json", "rb") as f:
+        raw = f.read()
+    tasks = (orjson.loads(raw) if orjson is not None else json.loads(raw))["tasks"]
 
     memory = load_memory()
     sup = Supervisor()
     stats = Counter()
 
-    for task in tasks:
-        result = sup.run(task, memory)
+    # агенти створюються один раз на весь прогін; задачі йдуть по черзі,
+    # бо прапорці з попередніх задач впливають на наступні
+    for result in sup.iter_batch(tasks, memory):
         tags = result.get("critique_tags", [])
+        stats.update(tags)
 
-        for t in tags:
-            stats[t] += 1
-
-        # learning rules (very simple)
+        # learning rules (very simple); прапорець ставимо одразу, бо він
+        # впливає на наступні задачі, а на диск пам'ять пишемо один раз нижче
         if "structure" in tags:
             set_flag(memory, "force_structure", True)
 
@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    """Окрема runs.db у tmp_path: пул і кеші читання сервера не бачать старих даних."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "runs.db")
+    db.init_db()
+    server = sys.modules.get("server")
+    if server is not None:
+        server._READ_CACHE.clear()
+        server._outline_payload_at.cache_clear()
+    yield db.DB_PATH
+    with db._POOL_LOCK:
+        pooled, db._POOL[:] = list(db._POOL), []
+    for conn in pooled:
+        db.sqlite3.Connection.close(conn)
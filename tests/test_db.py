@@ -0,0 +1,33 @@
+import db
+
+
+def test_pooled_connection_close_returns_it_to_the_pool(tmp_db):
+    conn = db.get_connection()
+    conn.close()
+
+    assert conn in db._POOL
+    assert db.get_connection() is conn
+
+
+def test_pooled_connection_close_rolls_back_open_transaction(tmp_db):
+    conn = db.get_connection()
+    conn.execute("INSERT INTO projects (name, type, created_at) VALUES ('tmp', 'generic', '')")
+    assert conn.in_transaction
+    conn.close()
+
+    again = db.get_connection()
+    assert again is conn
+    assert not again.in_transaction
+    assert again.execute("SELECT COUNT(*) FROM projects WHERE name = 'tmp'").fetchone()[0] == 0
+    again.close()
+
+
+def test_pool_drops_connections_to_another_db(tmp_db, tmp_path, monkeypatch):
+    conn = db.get_connection()
+    conn.close()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "other.db")
+
+    fresh = db.get_connection()
+    assert fresh is not conn
+    assert fresh.db_path == tmp_path / "other.db"
+    fresh.close()
@@ -0,0 +1,45 @@
+import subprocess
+
+import repo_tools as rt
+import tools_allowlist as ta
+
+
+def test_bre_literal_chars_are_searched_literally(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.py").write_text("print(x)\nprint x\na+b\naab\n")
+
+    assert rt.repo_search("print(", cached=False)["matches"] == "a.py:1:print(x)"
+    assert rt.repo_search("a+b", cached=False)["matches"] == "a.py:3:a+b"
+
+
+def test_rg_gets_only_queries_with_the_same_meaning(monkeypatch):
+    monkeypatch.setattr(rt, "_RG", "rg")
+
+    assert rt._search_cmd("def .*_scan", 5)[0] == "rg"
+    for q in ("foo(x)*", "a\\+b", "x{2}.", "*.py", "a|b."):
+        assert rt._search_cmd(q, 5)[0] != "rg", q
+
+
+def _git(*args):
+    subprocess.run(
+        ["git", "-c", "user.email=t@example.com", "-c", "user.name=t", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+def test_scan_cache_is_invalidated_after_git_apply(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.txt").write_text("old line\n")
+    _git("init", "-q")
+    _git("add", "a.txt")
+    _git("commit", "-q", "-m", "init")
+    rt.invalidate_caches()
+
+    # повний порожній результат за префіксом — база для поступового запиту
+    assert rt.repo_search("needl")["found"] is False
+    patch = "--- a/a.txt\n+++ b/a.txt\n@@ -1 +1,2 @@\n old line\n+needle here\n"
+    result = ta.run_tool("git_apply", {"patch": patch})
+    assert result["ok"] and result["data"]["returncode"] == 0, result
+
+    assert rt.repo_search("needle")["matches"] == "a.txt:2:needle here"
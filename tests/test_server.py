@@ -0,0 +1,46 @@
+import asyncio
+import json
+import re
+
+from fastapi.testclient import TestClient
+
+import db
+import server
+
+
+def _bootstrap_block(html: str) -> str:
+    match = re.search(r'<script id="bootstrap-data" type="application/json">(.*?)</script>', html, re.S)
+    assert match is not None
+    return match.group(1)
+
+
+def test_root_escapes_markup_in_bootstrap_data(tmp_db):
+    name = 'Book<!--<script></script>&"'
+    db.create_project(name, type_="writing")
+    db.set_current_project(name)
+
+    with TestClient(server.app) as client:
+        resp = client.get("/")
+
+    assert resp.status_code == 200
+    html = resp.text
+    block = _bootstrap_block(html)
+    assert not set("<>&") & set(block)
+    data = json.loads(block)
+    assert data["project"] == name
+    assert name in [p["name"] for p in data["projects"]]
+    # chat.js іде одразу після блоку даних і не поглинається ним
+    block_end = html.index("</script>", html.index("bootstrap-data"))
+    assert block_end < html.index('<script src="' + server._ROOT_JS_URL)
+
+
+def test_cached_read_prunes_locks_with_the_cache(tmp_db):
+    async def fill():
+        for i in range(server._READ_CACHE_MAX * 2):
+            await server._cached_read(("test_key", i), str, i)
+
+    server._READ_LOCKS.clear()
+    asyncio.run(fill())
+
+    assert len(server._READ_LOCKS) <= server._READ_CACHE_MAX
+    assert len(server._READ_CACHE) <= server._READ_CACHE_MAX
@@ -0,0 +1,41 @@
+import os
+import subprocess
+
+import pytest
+
+import tools_allowlist as ta
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="pytest worker needs fork")
+
+
+@pytest.fixture
+def worker():
+    yield
+    if ta._PYTEST_WORKER is not None:
+        ta._PYTEST_WORKER.kill()
+        ta._PYTEST_WORKER.wait()
+        ta._PYTEST_WORKER = None
+
+
+def test_worker_timeout_kills_the_fork(tmp_path, monkeypatch, worker):
+    pid_file = tmp_path / "pid"
+    (tmp_path / "test_slow.py").write_text(
+        "import os, time\n"
+        "def test_slow():\n"
+        f"    open({str(pid_file)!r}, 'w').write(str(os.getpid()))\n"
+        "    time.sleep(60)\n"
+    )
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        ta._run_pytest_worker(timeout_s=1, limit=1000)
+
+    child = int(pid_file.read_text())
+    with pytest.raises(ProcessLookupError):
+        os.kill(child, 0)
+    # сам воркер живий і приймає наступний прогін
+    assert ta._PYTEST_WORKER.poll() is None
+    pid_file.unlink()
+    (tmp_path / "test_slow.py").write_text("def test_fast():\n    pass\n")
+    code, out, _ = ta._run_pytest_worker(timeout_s=30, limit=1000)
+    assert code == 0, out
@@ -1,28 +1,26 @@
 from __future__ import annotations
 
+import json
+import os
 import subprocess
-from dataclasses import dataclass
-from typing import Any, Callable
+import sys
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
 
 import repo_tools as rt
 from db import get_recent_errors
 
 
-def _truncate(text: str, limit: int = 8000) -> str:
-    text = text or ""
-    if len(text) <= limit:
-        return text
-    return text[:limit].rstrip() + "…"
+# strip() + обрізання одним зрізом, без проміжних копій великого виводу
+_truncate = rt._truncate
 
 
-def _run_cmd(cmd: list[str], timeout_s: int = 20) -> tuple[int, str, str]:
-    proc = subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True,
-        timeout=timeout_s,
-    )
-    return proc.returncode, proc.stdout or "", proc.stderr or ""
+def _run_cmd(cmd: list[str], timeout_s: int = 20, limit: int = rt._OUT_LIMIT) -> tuple[int, str, str]:
+    """Запускає команду до кінця, але тримає в пам'яті лише ~limit символів stdout/stderr."""
+    code, out, err, _ = rt._run_cmd_head(cmd, limit, timeout_s=timeout_s, stop_early=False)
+    return code, out, err
 
 
 def _run_cmd_with_input(cmd: list[str], input_text: str, timeout_s: int = 20) -> tuple[int, str, str]:
@@ -30,26 +28,87 @@ def _run_cmd_with_input(cmd: list[str], input_text: str, timeout_s: int = 20) ->
         cmd,
         input=input_text,
         capture_output=True,
-        text=True,
+        encoding="utf-8",
+        errors="replace",
         timeout=timeout_s,
+        close_fds=False,
+        env=rt._cmd_env(),
     )
     return proc.returncode, proc.stdout or "", proc.stderr or ""
 
 
-def _run_pytest() -> dict:
-    cmd = ["python", "-m", "pytest", "-q"]
+PYTEST_TIMEOUT_S = 120
+_PYTEST_WORKER_PATH = Path(__file__).with_name("pytest_worker.py")
+_PYTEST_WORKER: Optional[subprocess.Popen] = None
+_PYTEST_LOCK = threading.Lock()
+
+
+def _pytest_worker() -> subprocess.Popen:
+    """Постійний pytest_worker.py (стартує при першому прогоні, перезапускається, якщо впав)."""
+    global _PYTEST_WORKER
+    if _PYTEST_WORKER is None or _PYTEST_WORKER.poll() is not None:
+        _PYTEST_WORKER = subprocess.Popen(
+            [sys.executable, str(_PYTEST_WORKER_PATH)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            encoding="utf-8",
+            errors="replace",
+            close_fds=False,
+        )
+    return _PYTEST_WORKER
+
+
+def _run_pytest_worker(timeout_s: int, limit: int) -> tuple[Any, str, str]:
+    """Прогін pytest через fork уже "теплого" воркера: без старту інтерпретатора й імпорту pytest.
+
+    Таймаут рахує сам воркер (SIGALRM у дочірньому процесі); якщо воркер не
+    відповів і після запасу — його вбито, наступний прогін підніме новий.
+    """
+    with _PYTEST_LOCK:
+        worker = _pytest_worker()
+        request = {"cwd": os.getcwd(), "args": ["-q"], "timeout_s": timeout_s, "limit": limit}
+        timer = threading.Timer(timeout_s + 10, worker.kill)
+        timer.start()
+        try:
+            worker.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")  # type: ignore[union-attr]
+            worker.stdin.flush()  # type: ignore[union-attr]
+            line = worker.stdout.readline()  # type: ignore[union-attr]
+        except OSError:
+            line = ""
+        finally:
+            timer.cancel()
+    if not line:
+        worker.kill()
+        raise subprocess.TimeoutExpired("pytest", timeout_s)
+    resp = json.loads(line)
+    if resp.get("code") == "timeout":
+        raise subprocess.TimeoutExpired("pytest", timeout_s)
+    return resp.get("code"), resp.get("stdout") or "", resp.get("stderr") or ""
+
+
+def run_pytest(timeout_s: int = PYTEST_TIMEOUT_S, limit: int = rt._OUT_LIMIT) -> dict:
+    """`pytest -q` у поточному каталозі: {"returncode", "stdout", "stderr"}.
+
+    Спільний для tool-а `pytest` і HeadAgent; при таймауті returncode == "timeout".
+    """
     try:
-        code, out, err = _run_cmd(cmd, timeout_s=120)
+        if hasattr(os, "fork"):
+            code, out, err = _run_pytest_worker(timeout_s, limit)
+        else:
+            # Windows: fork немає — звичайний `python -m pytest`
+            # (sys.executable — той самий інтерпретатор і абсолютний шлях)
+            cmd = [sys.executable, "-m", "pytest", "-q"]
+            code, out, err = _run_cmd(cmd, timeout_s=timeout_s, limit=limit)
     except subprocess.TimeoutExpired:
         return {
             "returncode": "timeout",
             "stdout": "",
-            "stderr": "Timeout (120s)",
+            "stderr": f"Timeout ({timeout_s}s)",
         }
     return {
         "returncode": code,
-        "stdout": _truncate(out.strip()),
-        "stderr": _truncate(err.strip()),
+        "stdout": _truncate(out, limit),
+        "stderr": _truncate(err, limit),
     }
 
 
@@ -60,92 +119,138 @@ class ToolSpec:
     args_schema: dict
     arg_specs: dict[str, dict[str, Any]]
     handler: Callable[[dict[str, Any]], Any]
+    # валідатор під саме цю схему — будується один раз у __post_init__
+    validate: Callable[[Any], dict[str, Any]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "validate", _make_validator(self.arg_specs))
 
 
-def _validate_args(spec: ToolSpec, args: Any) -> dict[str, Any]:
+def _no_args(args: Any) -> dict[str, Any]:
     if args is None:
-        args = {}
+        return {}
     if not isinstance(args, dict):
         raise ValueError("args must be an object")
+    for key in args:
+        raise ValueError(f"unknown arg: {key}")
+    return {}
 
-    for key in args.keys():
-        if key not in spec.arg_specs:
-            raise ValueError(f"unknown arg: {key}")
 
-    validated: dict[str, Any] = {}
-    for key, info in spec.arg_specs.items():
-        kind = info.get("type")
-        value = args.get(key)
-        if value is None and "default" in info:
-            value = info["default"]
+def _make_arg_check(key: str, info: dict[str, Any]) -> Callable[[Any], Any]:
+    """Перевірка одного аргумента; тип, дефолт і особливі ключі розібрано заздалегідь."""
+    kind = info.get("type")
+    has_default = "default" in info
+    default = info.get("default")
 
-        if kind == "int?":
+    if kind == "int?":
+        def check(value: Any) -> Any:
+            if value is None and has_default:
+                value = default
             if value is None:
-                validated[key] = None
-            else:
-                if not isinstance(value, int):
-                    raise ValueError(f"{key} must be int")
-                if value <= 0:
-                    raise ValueError(f"{key} must be > 0")
-                validated[key] = value
-        elif kind == "string":
+                return None
+            if not isinstance(value, int):
+                raise ValueError(f"{key} must be int")
+            if value <= 0:
+                raise ValueError(f"{key} must be > 0")
+            return value
+
+    elif kind == "string" and key == "patch":
+        def check(value: Any) -> Any:
+            if value is None and has_default:
+                value = default
+            if not isinstance(value, str):
+                raise ValueError(f"{key} must be string")
+            if len(value) < 10:
+                raise ValueError("patch too short")
+            return value
+
+    elif kind == "string":
+        min_len = 2 if key == "query" else 0
+        too_short = f"{key} too short"
+
+        def check(value: Any) -> Any:
+            if value is None and has_default:
+                value = default
             if not isinstance(value, str):
                 raise ValueError(f"{key} must be string")
-            if key == "patch":
-                if len(value) < 10:
-                    raise ValueError("patch too short")
-                validated[key] = value
-                continue
             value = value.strip()
-            if key == "query" and len(value) < 2:
-                raise ValueError("query too short")
+            if len(value) < min_len:
+                raise ValueError(too_short)
             if not value:
                 raise ValueError(f"{key} is required")
-            validated[key] = value
-        else:
-            raise ValueError("invalid args schema")
+            return value
+
+    else:
+        raise ValueError("invalid args schema")
+
+    return check
+
 
-    return validated
+def _make_validator(arg_specs: dict[str, dict[str, Any]]) -> Callable[[Any], dict[str, Any]]:
+    """Валідатор args для фіксованої схеми: без розбору arg_specs на кожен виклик."""
+    if not arg_specs:
+        return _no_args
+
+    checks = tuple((key, _make_arg_check(key, info)) for key, info in arg_specs.items())
+    known = frozenset(arg_specs)
+
+    def validate(args: Any) -> dict[str, Any]:
+        if args is None:
+            args = {}
+        elif not isinstance(args, dict):
+            raise ValueError("args must be an object")
+        elif not known.issuperset(args):
+            for key in args:
+                if key not in known:
+                    raise ValueError(f"unknown arg: {key}")
+        get = args.get
+        return {key: check(get(key)) for key, check in checks}
+
+    return validate
 
 
 def _tool_git_status(_args: dict[str, Any]) -> dict:
-    return rt.git_status()
+    return rt.git_status(cached=False)
 
 
 def _tool_git_diff(args: dict[str, Any]) -> dict:
     limit = args.get("limit", 8000)
     if limit is None:
         limit = 8000
-    return rt.git_diff(limit=limit)
+    return rt.git_diff(limit=limit, cached=False)
 
 
 def _tool_repo_search(args: dict[str, Any]) -> dict:
-    return rt.repo_search(query=args["query"], max_matches=args.get("max_matches", 50))
+    return rt.repo_search(query=args["query"], max_matches=args.get("max_matches", 50), cached=False)
 
 
 def _tool_git_apply_check(args: dict[str, Any]) -> dict:
     code, out, err = _run_cmd_with_input(
-        ["git", "apply", "--check", "-"],
+        [rt._GIT_BIN, "apply", "--check", "-"],
         args["patch"],
         timeout_s=20,
     )
     return {
         "returncode": code,
-        "stdout": _truncate(out.strip()),
-        "stderr": _truncate(err.strip()),
+        "stdout": _truncate(out),
+        "stderr": _truncate(err),
     }
 
 
 def _tool_git_apply(args: dict[str, Any]) -> dict:
-    code, out, err = _run_cmd_with_input(
-        ["git", "apply", "-"],
-        args["patch"],
-        timeout_s=20,
-    )
+    try:
+        code, out, err = _run_cmd_with_input(
+            [rt._GIT_BIN, "apply", "-"],
+            args["patch"],
+            timeout_s=20,
+        )
+    finally:
+        # дерево могло змінитись (навіть при помилці чи таймауті) — кеші /dev/git/* застаріли
+        rt.invalidate_caches()
     return {
         "returncode": code,
-        "stdout": _truncate(out.strip()),
-        "stderr": _truncate(err.strip()),
+        "stdout": _truncate(out),
+        "stderr": _truncate(err),
     }
 
 
@@ -154,7 +259,11 @@ def _tool_recent_errors(args: dict[str, Any]) -> list[dict]:
 
 
 def _tool_pytest(_args: dict[str, Any]) -> dict:
-    return _run_pytest()
+    try:
+        return run_pytest()
+    finally:
+        # тести можуть писати файли в репо
+        rt.invalidate_caches()
 
 
 _TOOLS: list[ToolSpec] = [
@@ -194,7 +303,7 @@ _TOOLS: list[ToolSpec] = [
     ),
     ToolSpec(
         name="repo_search",
-        description="Search in repo (grep)",
+        description="Search in repo (ripgrep, falls back to grep)",
         args_schema={"query": "string", "max_matches": "int?"},
         arg_specs={
             "query": {"type": "string", "default": ""},
@@ -223,15 +332,25 @@ _TOOLS: list[ToolSpec] = [
 _TOOL_BY_NAME: dict[str, ToolSpec] = {tool.name: tool for tool in _TOOLS}
 
 
+# _TOOLS незмінний після імпорту — опис інструментів будуємо (і серіалізуємо) один раз
+_LIST_TOOLS: tuple[dict, ...] = tuple(
+    {
+        "name": tool.name,
+        "description": tool.description,
+        "args_schema": tool.args_schema,
+    }
+    for tool in _TOOLS
+)
+_LIST_TOOLS_JSON: bytes = json.dumps(list(_LIST_TOOLS), ensure_ascii=False).encode("utf-8")
+
+
 def list_tools() -> list[dict]:
-    return [
-        {
-            "name": tool.name,
-            "description": tool.description,
-            "args_schema": tool.args_schema,
-        }
-        for tool in _TOOLS
-    ]
+    return list(_LIST_TOOLS)
+
+
+def list_tools_json() -> bytes:
+    """Той самий список, уже серіалізований у JSON (для /dev/tools)."""
+    return _LIST_TOOLS_JSON
 
 
 def run_tool(name: str, args: dict) -> dict:
@@ -239,7 +358,7 @@ def run_tool(name: str, args: dict) -> dict:
     if tool is None:
         raise ValueError(f"unknown tool: {name}")
 
-    validated_args = _validate_args(tool, args)
+    validated_args = tool.validate(args)
 
     try:
         payload = tool.handler(validated_args)